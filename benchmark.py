@@ -0,0 +1,439 @@
+"""
+Offline load test for teleBot.
+
+Starts a stand-in Bot API server in a child process and points the bot at it. Then
+drives simulated users through the polling or webhook entry point. Each user opens the
+menu, taps a range button and follows the deep link. Nothing is sent to real Telegram.
+
+    python benchmark.py --users 2000 --mode webhook --latency 40 --rate-429 0.01
+
+Reports p50/p99 latency per handler, end-to-end update latency, sends per second,
+memory growth and the JobQueue size.
+"""
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import random
+import resource
+import tempfile
+import time
+from collections import Counter, defaultdict, deque
+from typing import Optional
+from urllib.parse import parse_qs
+
+TOKEN = "123456:BENCHMARK"
+BOT_USER = {"id": 123456, "is_bot": True, "first_name": "Benchmark", "username": "benchmark_bot"}
+
+# Methods that the fake server may answer with an injected 429 or failure
+FLAKY_PREFIXES = ("send", "copy", "forward", "delete")
+
+
+# --- Fake Bot API Server ---
+class FakeBotAPI:
+    """
+    Minimal HTTP/1.1 stand-in for api.telegram.org.
+    - Bot API calls get canned answers after a configurable latency.
+    - Send/delete calls can be answered with injected 429s or 400s.
+    - Requests the real API rejects (a media group outside 2-10 items, say) get a 400.
+    - /_bench/enqueue queues updates for getUpdates; /_bench/stats returns counters.
+    """
+
+    def __init__(self, latency_ms: float, rate_429: float, failure_rate: float, retry_after: int):
+        self.latency = latency_ms / 1000
+        self.rate_429 = rate_429
+        self.failure_rate = failure_rate
+        self.retry_after = retry_after
+        self.updates = deque()
+        self.updates_ready = asyncio.Event()
+        self.calls = Counter()
+        self.sent = 0
+        self.first_send = None
+        self.last_send = None
+        self.message_id = 0
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                http_method, path, _ = request_line.decode().split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode().partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, payload = await self.dispatch(http_method, path, headers, body)
+                data = json.dumps(payload).encode()
+                writer.write(
+                    f"HTTP/1.1 {status} {'OK' if status == 200 else 'Error'}\r\n"
+                    f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, http_method: str, path: str, headers: dict, body: bytes):
+        if path.startswith("/_bench/"):
+            return 200, self.control(path, body)
+
+        method = path.rsplit("/", 1)[-1]
+        params = self.parse_params(headers, body)
+        self.calls[method] += 1
+
+        if method == "getUpdates":
+            return 200, {"ok": True, "result": await self.get_updates(float(params.get("timeout", 0)))}
+
+        await asyncio.sleep(self.latency * random.uniform(0.5, 1.5))
+        if method.startswith(FLAKY_PREFIXES):
+            roll = random.random()
+            if roll < self.rate_429:
+                self.calls["429"] += 1
+                return 429, {"ok": False, "error_code": 429,
+                             "description": f"Too Many Requests: retry after {self.retry_after}",
+                             "parameters": {"retry_after": self.retry_after}}
+            if roll < self.rate_429 + self.failure_rate:
+                self.calls["failed"] += 1
+                return 400, {"ok": False, "error_code": 400, "description": "Bad Request: injected failure"}
+
+        error = self.validate(method, params)
+        if error:
+            self.calls["rejected"] += 1
+            return 400, {"ok": False, "error_code": 400, "description": f"Bad Request: {error}"}
+        return 200, {"ok": True, "result": self.result_for(method, params)}
+
+    @staticmethod
+    def parse_params(headers: dict, body: bytes) -> dict:
+        if not body:
+            return {}
+        if headers.get("content-type", "").startswith("application/json"):
+            return json.loads(body)
+        return {key: values[0] for key, values in parse_qs(body.decode()).items()}
+
+    @staticmethod
+    def validate(method: str, params: dict) -> Optional[str]:
+        """Rejects requests the real Bot API would reject, so the benchmark cannot hide them."""
+        if method == "sendMediaGroup" and not 2 <= len(json.loads(params.get("media") or "[]")) <= 10:
+            return "wrong number of media in the group, must be 2-10"
+        if method == "copyMessages" and not 1 <= len(json.loads(params.get("message_ids") or "[]")) <= 100:
+            return "wrong number of message identifiers, must be 1-100"
+        return None
+
+    def result_for(self, method: str, params: dict):
+        if method == "getMe":
+            return BOT_USER
+        chat_id = int(params.get("chat_id", 0) or 0)
+        if method in ("sendMediaGroup", "copyMessages"):
+            count = len(json.loads(params.get("media") or params.get("message_ids") or "[]"))
+            self.record_sends(count)
+            if method == "copyMessages":
+                return [{"message_id": self.next_message_id()} for _ in range(count)]
+            return [self.message(chat_id) for _ in range(count)]
+        if method == "copyMessage":
+            self.record_sends(1)
+            return {"message_id": self.next_message_id()}
+        if method.startswith(("send", "forward")):
+            self.record_sends(1)
+            return self.message(chat_id)
+        return True
+
+    def record_sends(self, count: int) -> None:
+        now = time.monotonic()
+        self.sent += count
+        self.first_send = self.first_send or now
+        self.last_send = now
+
+    def next_message_id(self) -> int:
+        self.message_id += 1
+        return self.message_id
+
+    def message(self, chat_id: int) -> dict:
+        return {"message_id": self.next_message_id(), "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "private" if chat_id > 0 else "group"}}
+
+    async def get_updates(self, timeout: float) -> list:
+        if not self.updates:
+            self.updates_ready.clear()
+            try:
+                await asyncio.wait_for(self.updates_ready.wait(), timeout=min(timeout, 1.0))
+            except asyncio.TimeoutError:
+                return []
+        return [self.updates.popleft() for _ in range(min(100, len(self.updates)))]
+
+    def control(self, path: str, body: bytes):
+        if path == "/_bench/enqueue":
+            self.updates.extend(json.loads(body))
+            self.updates_ready.set()
+            return {"ok": True}
+        duration = (self.last_send - self.first_send) if self.sent > 1 else 0
+        return {"calls": dict(self.calls), "sent": self.sent,
+                "sends_per_second": self.sent / duration if duration else 0.0}
+
+
+def serve_fake_api(port: int, latency_ms: float, rate_429: float, failure_rate: float, retry_after: int) -> None:
+    """Child-process entry point: runs the fake Bot API until the process is terminated."""
+    async def serve():
+        api = FakeBotAPI(latency_ms, rate_429, failure_rate, retry_after)
+        server = await asyncio.start_server(api.handle_connection, "127.0.0.1", port, backlog=1024)
+        async with server:
+            await server.serve_forever()
+
+    asyncio.run(serve())
+
+
+# --- Simulated Users ---
+class UpdateFactory:
+    """Builds raw Bot API update dicts for simulated users."""
+
+    def __init__(self):
+        self.update_id = 0
+
+    def _next_id(self) -> int:
+        self.update_id += 1
+        return self.update_id
+
+    @staticmethod
+    def _user(user_id: int) -> dict:
+        return {"id": user_id, "is_bot": False, "first_name": f"User{user_id}"}
+
+    def command(self, user_id: int, text: str) -> dict:
+        update_id = self._next_id()
+        command_length = len(text.split()[0])
+        return {"update_id": update_id, "message": {
+            "message_id": update_id, "date": int(time.time()), "text": text, "from": self._user(user_id),
+            "chat": {"id": user_id, "type": "private"},
+            "entities": [{"type": "bot_command", "offset": 0, "length": command_length}],
+        }}
+
+    def button(self, user_id: int, data: str) -> dict:
+        update_id = self._next_id()
+        return {"update_id": update_id, "callback_query": {
+            "id": str(update_id), "from": self._user(user_id), "chat_instance": str(user_id), "data": data,
+            "message": {"message_id": update_id, "date": int(time.time()), "text": "menu",
+                        "chat": {"id": user_id, "type": "private"}},
+        }}
+
+
+class Recorder:
+    """Collects handler timings and the time each update was handed to the bot."""
+
+    def __init__(self):
+        self.handler_latency = defaultdict(list)
+        self.end_to_end = []
+        self.posted_at = {}
+        self.handled = 0
+
+    def wrap(self, name: str, callback):
+        async def timed(update, context, *args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await callback(update, context, *args, **kwargs)
+            finally:
+                finished = time.perf_counter()
+                self.handler_latency[name].append(finished - started)
+                if name != "send_video_series":
+                    self.handled += 1
+                    posted = self.posted_at.pop(update.update_id, None)
+                    if posted is not None:
+                        self.end_to_end.append(finished - posted)
+        return timed
+
+
+def percentile(values: list, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def rss_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+# --- Benchmark Run ---
+async def wait_for_port(port: int, timeout: float = 10) -> None:
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            _, writer = await asyncio.open_connection("127.0.0.1", port)
+            writer.close()
+            return
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.05)
+
+
+async def run_benchmark(args) -> dict:
+    import httpx
+    import teleBot
+
+    logging.getLogger().setLevel(args.log_level)
+    teleBot.catalog.load()
+    recorder = Recorder()
+    application = teleBot.build_application(TOKEN, base_url=f"http://127.0.0.1:{args.api_port}/bot")
+    for handlers in application.handlers.values():
+        for handler in handlers:
+            handler.callback = recorder.wrap(handler.callback.__name__, handler.callback)
+    teleBot.send_video_series = recorder.wrap("send_video_series", teleBot.send_video_series)
+
+    await application.initialize()
+    await application.post_init(application)
+    if args.mode == "polling":
+        await application.updater.start_polling(poll_interval=0, timeout=1)
+    else:
+        await application.updater.start_webhook(
+            listen="127.0.0.1", port=args.webhook_port, url_path=TOKEN,
+            webhook_url=f"http://127.0.0.1:{args.webhook_port}/{TOKEN}",
+        )
+    await application.start()
+
+    episode_range = teleBot.catalog.ranges_by_payload[args.payload]
+    factory = UpdateFactory()
+    samples = []
+    rss_start = rss_bytes()
+    started = time.monotonic()
+
+    async with httpx.AsyncClient(limits=httpx.Limits(max_connections=100), timeout=30) as client:
+        async def deliver(update: dict) -> None:
+            recorder.posted_at[update["update_id"]] = time.perf_counter()
+            if args.mode == "polling":
+                await client.post(f"http://127.0.0.1:{args.api_port}/_bench/enqueue", content=json.dumps([update]))
+            else:
+                await client.post(f"http://127.0.0.1:{args.webhook_port}/{TOKEN}", json=update)
+
+        async def simulate_user(user_id: int) -> None:
+            await deliver(factory.command(user_id, "/start"))
+            await asyncio.sleep(args.think_time)
+            await deliver(factory.button(user_id, episode_range.callback_data))
+            await asyncio.sleep(args.think_time)
+            await deliver(factory.command(user_id, f"/start {episode_range.payload}"))
+
+        async def sample() -> None:
+            while True:
+                samples.append((len(application.job_queue.jobs()), teleBot.expiry.pending, rss_bytes()))
+                await asyncio.sleep(0.5)
+
+        sampler = asyncio.create_task(sample())
+        users = []
+        for n in range(args.users):
+            users.append(asyncio.create_task(simulate_user(1000 + n)))
+            await asyncio.sleep(1 / args.arrival_rate)
+        await asyncio.gather(*users)
+
+        expected = args.users * 3
+        deadline = time.monotonic() + args.timeout
+        while (recorder.handled < expected or teleBot.in_flight_sends) and time.monotonic() < deadline:
+            await asyncio.sleep(0.2)
+        elapsed = time.monotonic() - started
+        sampler.cancel()
+        unfinished = len(teleBot.in_flight_sends)
+        # Application.stop() waits for background tasks, so drop the range sends still running at the deadline
+        for task in list(teleBot.in_flight_sends.values()):
+            task.cancel()
+
+        stats = (await client.get(f"http://127.0.0.1:{args.api_port}/_bench/stats")).json()
+
+    await application.updater.stop()
+    await application.stop()
+    await application.shutdown()
+    await application.post_shutdown(application)
+
+    return {
+        "mode": args.mode,
+        "users": args.users,
+        "elapsed_s": round(elapsed, 2),
+        "updates_handled": recorder.handled,
+        "updates_expected": expected,
+        "sends_unfinished": unfinished,
+        "handler_latency_ms": {
+            name: {"count": len(values), "p50": round(percentile(values, 50) * 1000, 2),
+                   "p99": round(percentile(values, 99) * 1000, 2)}
+            for name, values in recorder.handler_latency.items()
+        },
+        "end_to_end_ms": {"p50": round(percentile(recorder.end_to_end, 50) * 1000, 2),
+                          "p99": round(percentile(recorder.end_to_end, 99) * 1000, 2)},
+        "sends": stats["sent"],
+        "sends_per_second": round(stats["sends_per_second"], 2),
+        "api_calls": stats["calls"],
+        "rss_growth_mb": round((max((s[2] for s in samples), default=rss_start) - rss_start) / 2**20, 2),
+        "jobqueue_size_max": max((s[0] for s in samples), default=0),
+        "pending_deletions_max": max((s[1] for s in samples), default=0),
+    }
+
+
+def print_report(report: dict) -> None:
+    print(f"\n=== {report['mode']} | {report['users']} users | {report['elapsed_s']} s ===")
+    print(f"updates handled       {report['updates_handled']}/{report['updates_expected']}")
+    print(f"range sends unfinished at timeout {report['sends_unfinished']}")
+    for name, latency in report["handler_latency_ms"].items():
+        print(f"{name:<22}n={latency['count']:<6} p50={latency['p50']:>9} ms  p99={latency['p99']:>9} ms")
+    print(f"{'end-to-end update':<22}{'':<8} p50={report['end_to_end_ms']['p50']:>9} ms  "
+          f"p99={report['end_to_end_ms']['p99']:>9} ms")
+    print(f"sends                 {report['sends']} ({report['sends_per_second']}/s)")
+    print(f"429s / failures       {report['api_calls'].get('429', 0)} / {report['api_calls'].get('failed', 0)}")
+    print(f"rejected requests     {report['api_calls'].get('rejected', 0)}")
+    print(f"RSS growth            {report['rss_growth_mb']} MB")
+    print(f"JobQueue size (max)   {report['jobqueue_size_max']}")
+    print(f"pending deletions     {report['pending_deletions_max']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Load-test teleBot against a local fake Bot API server.")
+    parser.add_argument("--mode", choices=("polling", "webhook"), default="polling")
+    parser.add_argument("--users", type=int, default=1000, help="number of simulated users")
+    parser.add_argument("--arrival-rate", type=float, default=100, help="new users per second")
+    parser.add_argument("--think-time", type=float, default=0.2, help="seconds between a user's actions")
+    parser.add_argument("--payload", default="onepiece_101-200", help="deep-link payload each user follows")
+    parser.add_argument("--latency", type=float, default=30, help="mean fake API latency in ms")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="fraction of sends answered with a 429")
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="fraction of sends answered with a 400")
+    parser.add_argument("--retry-after", type=int, default=1, help="retry_after seconds in injected 429s")
+    parser.add_argument("--global-rate", type=float, help="override GLOBAL_SEND_RATE")
+    parser.add_argument("--chat-rate", type=float, help="override CHAT_SEND_RATE")
+    parser.add_argument("--api-port", type=int, default=18081)
+    parser.add_argument("--webhook-port", type=int, default=18082)
+    parser.add_argument("--timeout", type=float, default=600, help="max seconds to wait for sends to finish")
+    parser.add_argument("--log-level", default="WARNING", help="log level for the bot while benchmarking")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    # teleBot reads its configuration at import time, so it has to be set up first
+    workdir = tempfile.mkdtemp(prefix="telebot-bench-")
+    os.environ["PERSISTENCE_PATH"] = os.path.join(workdir, "persistence")
+    os.environ["LEDGER_PATH"] = os.path.join(workdir, "ledger")
+    if args.global_rate:
+        os.environ["GLOBAL_SEND_RATE"] = str(args.global_rate)
+    if args.chat_rate:
+        os.environ["CHAT_SEND_RATE"] = str(args.chat_rate)
+
+    server = multiprocessing.Process(
+        target=serve_fake_api,
+        args=(args.api_port, args.latency, args.rate_429, args.failure_rate, args.retry_after),
+        daemon=True,
+    )
+    server.start()
+    try:
+        asyncio.run(wait_for_port(args.api_port))
+        report = asyncio.run(run_benchmark(args))
+    finally:
+        server.terminate()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
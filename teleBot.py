@@ -1,359 +1,1502 @@
-import asyncio
-import logging
-import os
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
-from telegram.ext import (
-    Application,
-    CommandHandler,
-    CallbackQueryHandler,
-    ContextTypes,
-    PicklePersistence,
-)
-
-# Deletion delay in seconds (24 hours = 86400)
-DELETION_DELAY_SECONDS = 86400
-
-# --- Logging Setup ---
-logging.basicConfig(
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
-)
-logger = logging.getLogger(__name__)
-
-# --- JobQueue Callback Function ---
-async def delete_message_callback(context: ContextTypes.DEFAULT_TYPE) -> None:
-    """
-    Callback function for the JobQueue. Deletes the message specified in the job's data.
-    """
-    job_data = context.job.data
-    chat_id = job_data["chat_id"]
-    message_id = job_data["message_id"]
-    try:
-        await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
-        logger.info(f"Successfully deleted message {message_id} from chat {chat_id}.")
-    except Exception as e:
-        logger.error(f"Failed to delete message {message_id} in chat {chat_id}: {e}")
-
-
-# --- Command Handlers ---
-async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """
-    Handles the /start command.
-    - If it has a payload (from a deep link), it sends videos.
-    - Otherwise, it shows the main menu.
-    """
-    # Check if the command includes a payload (from a deep link)
-    if context.args:
-        payload = context.args[0]
-        logger.info(f"Deep link clicked with payload: {payload}")
-
-        payload_map = {
-            'onepiece_1-100': ("Episodes 1-100", 1),
-            'onepiece_101-200': ("Episodes 101-200", 101),
-            'onepiece_201-300': ("Episodes 201-300", 201),
-            'onepiece_301-400': ("Episodes 301-400", 301),
-            'onepiece_401-500': ("Episodes 401-500", 401),
-            'onepiece_501-600': ("Episodes 501-600", 501),
-            'onepiece_601-700': ("Episodes 601-700", 601),
-            'onepiece_701-800': ("Episodes 701-800", 701),
-            'onepiece_801-900': ("Episodes 801-900", 801),
-            'onepiece_901-1000': ("Episodes 901-1000", 901),
-            'onepiece_1001-1100': ("Episodes 1001-1100", 1001),
-            'onepiece_1101-Ongoing': ("Episodes 1101-Ongoing", 1101),
-        }
-
-        if payload in payload_map:
-            series_name, start_episode = payload_map[payload]
-            await send_video_series(update, context, series_name, start_episode)
-        else:
-            await update.message.reply_text("Sorry, I don't recognize this link.")
-
-    else:
-        # If there's no payload, show the main menu
-        keyboard = [
-            [InlineKeyboardButton("O-n-e P-iece (1 - 100) ကြည့်ရန် နှိပ်ပါ", callback_data='ep_1-100')],
-            [InlineKeyboardButton("O-n-e P-iece (101 - 200) ကြည့်ရန် နှိပ်ပါ", callback_data='ep_101-200')],
-            [InlineKeyboardButton("O-n-e P-iece (201 - 300) ကြည့်ရန် နှိပ်ပါ", callback_data='ep_201-300')],
-            [InlineKeyboardButton("O-n-e P-iece (301 - 400) ကြည့်ရန် နှိပ်ပါ", callback_data='ep_301-400')],
-            [InlineKeyboardButton("O-n-e P-iece (401 - 500) ကြည့်ရန် နှိပ်ပါ", callback_data='ep_401-500')],
-            [InlineKeyboardButton("O-n-e P-iece (501 - 600) ကြည့်ရန် နှိပ်ပါ", callback_data='ep_501-600')],
-            [InlineKeyboardButton("O-n-e P-iece (601 - 700) ကြည့်ရန် နှိပ်ပါ", callback_data='ep_601-700')],
-            [InlineKeyboardButton("O-n-e P-iece (701 - 800) ကြည့်ရန် နှိပ်ပါ", callback_data='ep_701-800')],
-            [InlineKeyboardButton("O-n-e P-iece (801 - 900) ကြည့်ရန် နှိပ်ပါ", callback_data='ep_801-900')],
-            [InlineKeyboardButton("O-n-e P-iece (901 - 1000) ကြည့်ရန် နှိပ်ပါ", callback_data='ep_901-1000')],
-            [InlineKeyboardButton("O-n-e P-iece (1001 - 1100) ကြည့်ရန် နှိပ်ပါ", callback_data='ep_1001-1100')],
-            [InlineKeyboardButton("O-n-e P-iece (1101 - Ongoing) ကြည့်ရန် နှိပ်ပါ", callback_data='ep_1101-Ongoing')],
-        ]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        welcome_message = ("Hello 👋\n\nကြိုက်နှစ်သက်ရာ Season အလိုက်နှိပ်ပါ။"
-                                      "\nMain Channel လေးကိုလဲ Joinထားပေးပါနော်"
-                                      "\n@Naruto_MainChannel")
-        await update.message.reply_text(welcome_message, reply_markup=reply_markup)
-
-
-# --- Video Sending Logic ---
-async def send_video_series(update: Update, context: ContextTypes.DEFAULT_TYPE, series_name: str, start_episode: int):
-    """
-    Sends a series of videos and schedules them for deletion.
-    """
-    chat_id = update.effective_chat.id
-    await context.bot.send_message(chat_id=chat_id, text=f"Sending {series_name}...")
-
-    # --- VIDEO FILE IDs ---
-    # Remember to fill in all your video IDs here!
-    video_lists = {
-        "Episodes 1-100": [
-            "BAACAgQAAxkBAAECL3ZosMc8u3GRo9ZbNzaaODG5PuwongACqwgAAsDuCFBhZ0CFNldFuzYE",
-            "BAACAgQAAxkBAAECL3dosMc8ssNO9saWKP0d4CuNxLDIXAACtggAAsDuCFDIboTGOYKrwjYE",
-            "BAACAgQAAxkBAAECM_toswsTQVpbchr8dDz6wlclFY3FVQACtwgAAsDuCFBx_NC7OhTU4zYE",
-            "BAACAgQAAxkBAAECM_xoswsT1WzFP2Z-azbHz9zjJhwaEwACuggAAsDuCFD7SnwM4BDw3DYE",
-            "BAACAgUAAxkBAAECM_1oswsTrZojnd53dX4auCwl9hBhswACQAQAAmv5CFe-fWdjwURayjYE",
-            "BAACAgUAAxkBAAECM_5oswsTbev67fIFlvd9r56FNws42QACRQQAAmv5CFebx4HTFGWSojYE",
-            "BAACAgUAAxkBAAECM_9oswsTUtOu8PVxGtJACPypn6PWqQACRgQAAmv5CFd5PkurGnyO7TYE",
-            "BAACAgUAAxkBAAECNAABaLMLE_m1HFuzOsxQrd6gHIPA0B4AAkgEAAJr-QhXcqPCPnGThCA2BA",
-            "BAACAgUAAxkBAAECNAFoswsTXi4cyB1lMgYvAbfpFxIlzgACSQQAAmv5CFfvGa02NedtDzYE",
-            "BAACAgUAAxkBAAECNAJoswsTyZDOSLTNBQsAATvE9a-P16IAAkoEAAJr-QhXjDiohOvxDqQ2BA",
-            "BAACAgUAAxkBAAECNBZoswxPCjWQmRBsL6SNgsgDPa-ZwQACogIAAmv5EFfnjoaY9Bqm2jYE",
-            "BAACAgUAAxkBAAECNBdoswxPd5zSKsLpavk0OD8CX4o8ggAC3wIAAmv5EFcsA2oUm9_gbDYE",
-            "BAACAgUAAxkBAAECNBhoswxPeewOm2BFX4BXnB0m7WI7wAAC5AIAAmv5EFcTYX0sUUOH6zYE",
-            "BAACAgUAAxkBAAECNBloswxPXBzMIQnAop_h1YjfVg8WmgACCAMAAmv5EFfZKDDHAlxcizYE",
-            "BAACAgUAAxkBAAECNBposwxPaSqypKJnKo-bZf99wvPKRgACCQMAAmv5EFfoy00DMPUWxTYE",
-            "BAACAgUAAxkBAAECNBtoswxPshKyaXNs22sjdPfE0vFPKAACGQMAAmv5EFed10L0g-9GYTYE",
-            "BAACAgUAAxkBAAECNBxoswxPyU_aju3vAeGsNZ4doOLNkgACKAMAAmv5EFcZx-12OHap6TYE",
-            "BAACAgUAAxkBAAECNB1oswxPnzlHqnQsCjMov0dBLqvZQQACKQMAAmv5EFc0Q5G9PL6XJDYE",
-            "BAACAgUAAxkBAAECNB5oswxPUzxG9Pi9OEuqOhsVVY6_5QACGQIAApD8IVd-llBgx4hVRjYE",
-            "BAACAgUAAxkBAAECNB9oswxP7BctAAFgpyqtZShg25GP7MAAAh0CAAKQ_CFXPSFJUnAk0cw2BA",
-            "BAACAgUAAxkBAAECNDhosw18906SXGjEhclO0vR6CaYgIAACHgIAApD8IVcLxN3QkPct8zYE",
-            "BAACAgUAAxkBAAECNDlosw18RI5_qyEq_A1r3etL1sDgXQACMAMAAtElCFSwm4oQxP2P0DYE",
-            "BAACAgQAAxkBAAECNDposw18LZF14f7bNg1gKDJl3R2utgACzggAAsDuCFByJ2h8qow3ojYE",
-            "BAACAgUAAxkBAAECNDtosw18p9ms0PcNLb9imUEnueNuswACMgMAAtElCFRzK17oDuOyMjYE",
-            "BAACAgUAAxkBAAECNDxosw184G6cTnYG5qM8Rx7qxZ9pigACMwMAAtElCFR0KwokAAE_4Q42BA",
-            "BAACAgQAAxkBAAECND1osw18PRLMxZdB9TSj1IAhc4vsHQAC5AgAAsDuCFD_bqOB1pPJ0jYE",
-            "BAACAgUAAxkBAAECND5osw18Qs6kDyiZRW0w-O3qzKKJTwACNAMAAtElCFSY0g_h-hcMJzYE",
-            "BAACAgUAAxkBAAECND9osw18li_K4hAXqtasKugJRlSGXgACNQMAAtElCFSsvxiU5eyxSDYE",
-            "BAACAgQAAxkBAAECNEBosw18t7QAAakyr7CPc0eXnSvprowAAhUJAALA7ghQZbmV40LzsAABNgQ",
-            "BAACAgUAAxkBAAECNEFosw18v3NT1UBMt-XJapaJ-qQxkgACNgMAAtElCFTg9zF4V2cKyzYE",
-            "BAACAgUAAxkBAAECNFBosw6ots95s0DVnlfibk1apu3YTAACOAMAAtElCFRpyiLJnWPHpjYE",
-            "BAACAgUAAxkBAAECNFFosw6oa-KsaWwSxxbrm29sYXOmFQACOQMAAtElCFTg-0hovdRjlzYE",
-            "BAACAgUAAxkBAAECNFJosw6oj76SdJZAEWsB0gK3NZsEFAACOwMAAtElCFTp76pH6DypVzYE",
-            "BAACAgUAAxkBAAECNFNosw6oNUofS3o0Ha5idHKjBW-XFQACOgMAAtElCFRJZKtl_gO63zYE",
-            "BAACAgUAAxkBAAECNFRosw6oyZ7h8nhedkte5dtmpfZuZgACPAMAAtElCFT3NBxVoF_N3zYE",
-            "BAACAgUAAxkBAAECNFVosw6oWszHHRlprP3KiwUTj-eBBwACPgMAAtElCFT1rmsHa9jNTjYE",
-            "BAACAgUAAxkBAAECNFZosw6oR4ZUYHRBgp51CkD1dFdPuAACPwMAAtElCFTIKESF3h2D8jYE",
-            "BAACAgUAAxkBAAECNFdosw6oVkFQG8j4OuVLCXaW2Ow4hgACQAMAAtElCFTEmDUVpEyXjTYE",
-            "BAACAgUAAxkBAAECNFhosw6oFLMjaGc5lPMcMYWFLudvKwACQQMAAtElCFSDzeDj77MG8zYE",
-            "BAACAgUAAxkBAAECNFlosw6ooHv0ZSbQt3-ZFCjOqWViFAACQgMAAtElCFSvj6JUdo-LgjYE",
-            "BAACAgUAAxkBAAECNGposxB7Bx-gRUqULxF5wwGAtOIpogACQwMAAtElCFTIxGG9v8qCgzYE",
-            "BAACAgUAAxkBAAECNGtosxB71FP96vAlYcosFDt6NtP83wACRQMAAtElCFSW2b9P09DZ8jYE",
-            "BAACAgUAAxkBAAECNGxosxB7xpmtqTCL-hQqoi4QsQh5gAACRAMAAtElCFSnOEkjeFPO-zYE",
-            "BAACAgUAAxkBAAECNG1osxB7_oInMOR2713CGfs394EG_gACRwMAAtElCFS44M_3vwMnOjYE",
-            "BAACAgUAAxkBAAECNG5osxB7ngJDSREEgxq3fSYiR32ebAACRgMAAtElCFRbsDtAdhtF9DYE",
-            "BAACAgUAAxkBAAECNG9osxB71zZrl8CeeBQq2s6w-DggCAACSAMAAtElCFTENusZGK_iJDYE",
-            "BAACAgUAAxkBAAECNHBosxB7OyNa-_DiCmoS_9PpuVFP-AACSQMAAtElCFQGAiQ9RHjkeTYE",
-            "BAACAgUAAxkBAAECNHFosxB7hvn5txUVnxpIaJMh7PTxWwACSwMAAtElCFSfavIcSitshzYE",
-            "BAACAgUAAxkBAAECNHJosxB7JBU53_mEgFZ9Wel18zjd3gACSgMAAtElCFSxUUtwTuN-7jYE",
-            "BAACAgUAAxkBAAECNHNosxB7PGLAwDBswPzrR0vNfZieFQACTAMAAtElCFRQl3a296MggTYE",
-            "BAACAgUAAxkBAAECNH5osxGTFMUy1IMFYgpck78ngKM5DQACTQMAAtElCFTFtE5O8o1NjTYE",
-            "BAACAgUAAxkBAAECNH9osxGT6eJP03Qh1rEoefgNgF4eAANOAwAC0SUIVE1pVSL7vO5cNgQ",
-            "BAACAgUAAxkBAAECNIBosxGTI5yoj2rn3FlKWIFyVROydAACUAMAAtElCFRA2zZP4TxOJDYE",
-            "BAACAgUAAxkBAAECNIFosxGTaSyyeOZP0MmsNhyKYXDuCQACUQMAAtElCFTHkHHBNQRWoDYE",
-            "BAACAgUAAxkBAAECNIJosxGTvGXYcsH3CTtuCRQbPMFIhwACTwMAAtElCFSYs4OvJxOTHDYE",
-            "BAACAgUAAxkBAAECNINosxGTTEKcIO_JYgHxhXvolIoPQQACUgMAAtElCFRDwdVQLgoicTYE",
-            "BAACAgUAAxkBAAECNIRosxGTb_5b35uObR44xfLtqPcFGwACUwMAAtElCFSIKTxsti5DjDYE",
-            "BAACAgUAAxkBAAECNIVosxGTmGau9-ffPqqKBr_jqdpGkQACVAMAAtElCFQMDXrh7TREyjYE",
-            "BAACAgUAAxkBAAECNIZosxGTLoAujl8SIVJ15zBRI3UTDgACVQMAAtElCFSbmMFUDoK2rTYE",
-            "BAACAgUAAxkBAAECNIdosxGTMZyt0WXfkpU9XoXWrXIvxAACVgMAAtElCFRgNupaYapRRTYE",
-            "BAACAgUAAxkBAAECNIhosxGTQ6Afwzrx-zrDtCtJ0wi3yAACWAMAAtElCFQtCuq94HC2jzYE",
-            "BAACAgUAAxkBAAECNIlosxGTqvnm0SHtCscpRU01t8TCXAACWgMAAtElCFQG0zjBWtcibTYE",
-            "BAACAgUAAxkBAAECNIposxGTamt8b1szJbF1whhawBUW9AACVwMAAtElCFTi2FP877kPuzYE",
-            "BAACAgUAAxkBAAECNIxosxGTAAFBRnhXN1YrrSvs6IBUG1EAAlkDAALRJQhUp-8r3L8QBzE2BA",
-            "BAACAgUAAxkBAAECNI1osxGTRH4NAwOabnIDpulBpx0g9AACXAMAAtElCFQ7D9v71i6I_zYE",
-            "BAACAgUAAxkBAAECNI5osxGTpw15x46tMC0pDrMoKuhxTAACWwMAAtElCFQvJYqZCZ2HbDYE",
-            "BAACAgUAAxkBAAECNI9osxGTJUq7Rr9fs0QCBpnh22nq0QACXQMAAtElCFQEzaYe6zhnJDYE",
-            "BAACAgUAAxkBAAECNJBosxGTAAGjKmQ9ggnvIn9RA968q7IAAl8DAALRJQhUhp5rIl_rkfg2BA",
-            "BAACAgUAAxkBAAECNJFosxGUPlL4p02YmLa2q2O3nldkmAACXgMAAtElCFQ34HfuCa2DszYE",
-            "BAACAgUAAxkBAAECNJJosxGUiflrLrCW0-1u4SDSa1egqAACYAMAAtElCFRL24KMMuT8cTYE",
-            "BAACAgUAAxkBAAECNJNosxGUjhNI6D0EEJ26Cdm3XyqEJgACYQMAAtElCFS0u3-08ux57DYE",
-            "BAACAgUAAxkBAAECNJRosxGU-vABWsUmb3_WU6XsPpAXFQACYgMAAtElCFSxvlJGwr931jYE",
-            "BAACAgUAAxkBAAECNJVosxGUT5VKsB2BPu9NLuPiKyShoQACYwMAAtElCFTef5nXn8ZGTDYE",
-            "BAACAgUAAxkBAAECNJZosxGUNMaXtmBl3m_K3C-D--sCTAACZAMAAtElCFTPkU_THXYh1TYE",
-            "BAACAgUAAxkBAAECNJdosxGUp-vhvH17lB0kfcJOuHuGZgACZQMAAtElCFSmLdVepQJ1dDYE",
-            "BAACAgUAAxkBAAECNJhosxGUxZDiyi7inBLRj5dUuTlcjQACagMAAtElCFQM3T-OvdcB0zYE",
-            "BAACAgUAAxkBAAECNJlosxGUw_D7XpkBm9LFgBIlg3DTlQACZwMAAtElCFQ7MCsS7gFJ4DYE",
-            "BAACAgUAAxkBAAECNJtosxGU9R3XOzt2KHYcMI5k0mXQLQACaQMAAtElCFSgPIOJirnPuTYE",
-            "BAACAgUAAxkBAAECNJxosxGUnoDGn6zwjPE-z6LQsegeSAACaAMAAtElCFTZ-XubbVCjujYE",
-            "BAACAgUAAxkBAAECNJ1osxGUsoAxw7RNDzb2H88ahyiA-gACbAMAAtElCFTpnQg77nXyNTYE",
-            "BAACAgUAAxkBAAECNJ5osxGUgkZdPGctZt-zGEWlKcrengACbgMAAtElCFRj1Bo0Lim0cTYE",
-            "BAACAgUAAxkBAAECNJ9osxGU5IOx3nUY2YHWCLAzBUwNAwACawMAAtElCFS1ZAxkYLBZTTYE",
-            "BAACAgUAAxkBAAECNKBosxGUnoZ0Y5ie5ZdBW1_9Wbn0bwACbwMAAtElCFT4tGK2UKZ7FjYE",
-            "BAACAgUAAxkBAAECNKFosxGUL7Z5b15a2GvQfDetSokm7wACcQMAAtElCFRobHPKohbrjDYE",
-            "BAACAgUAAxkBAAECNKJosxGURF6WtaXsO8rvuKYBGezMQwACcwMAAtElCFQv--57NQ7-ZTYE",
-            "BAACAgUAAxkBAAECNKNosxGUKiJQCwr8b3MvQP7cP_LZSQACdQMAAtElCFQnu7G7ir5qXzYE",
-            "BAACAgUAAxkBAAECNKRosxGU-iSLFo2IYTCYF7uBF55LswACdAMAAtElCFQjcx-A0qpyTTYE",
-            "BAACAgUAAxkBAAECNKVosxGU6aC-82TB8Hz7QxChhN5bLgACcgMAAtElCFT2ZF-L8Bjr0jYE",
-            "BAACAgUAAxkBAAECNKZosxGU8zqTmO8Nryrp449K_k9utwACdgMAAtElCFTuo_CwGOHNpTYE",
-            "BAACAgUAAxkBAAECNKdosxGU-wVAf_gcAmg5QTZ6307_JQACeQMAAtElCFRBvpzoFPvE8zYE",
-            "BAACAgUAAxkBAAECNKhosxGUUP_HMU92TeRwUgp6vIdy9gACdwMAAtElCFRq0Mq_Pg-j3DYE",
-            "BAACAgUAAxkBAAECNKposxGUBDctPpCfjSSSK6ux6_9ngwACeAMAAtElCFSa0sjcZTlsZTYE",
-            "BAACAgUAAxkBAAECNKtosxGU2eUY4w_T4tJ8L7cwX7UFpAACegMAAtElCFQ7vnl0f8mo1jYE",
-            "BAACAgUAAxkBAAECNKxosxGUUopRKIMsndLOjFNkoWCeQwACfQMAAtElCFSljhj_0RUXmzYE",
-            "BAACAgUAAxkBAAECNK1osxGUWcR1aVA9zuXRhKZlU-cMSwACewMAAtElCFT7p3qe3oVkjTYE",
-            "BAACAgUAAxkBAAECNK5osxGU5-SvVLiyei-LBWFfDvHZBwACfAMAAtElCFSb9Wvy7EcZyDYE",
-            "BAACAgUAAxkBAAECNK9osxGUQx33hVWJHc9BSPDPcDBG9QACfgMAAtElCFT65rf8CUJ51TYE",
-            "BAACAgUAAxkBAAECNLBosxGUf_wVMGNcR_k2ocDmNhR7pgACgQMAAtElCFRqyLGXzXKH9DYE",
-            "BAACAgUAAxkBAAECNLFosxGUyinhJhWdsEBHdmg03vxK_AACgAMAAtElCFSF6ekrVqxukTYE",
-            "BAACAgUAAxkBAAECL6NosOPe5Wh9LY_2OuFFhaladB7qQAACfwMAAtElCFSesM6RHH6A8DYE",
-        ],
-        "Episodes 101-200": [
-            "BAACAgUAAxkBAAECL6RosOPeiOYS9WXw_P-HcBUquU2cXwACggMAAtElCFQIASrMxZ9CAAE2BA",
-            "BAACAgUAAxkBAAECL8RosOtKsCGRQoeMfTPgXDw5rwZipwAChAMAAtElCFSoxg5HYX54rzYE"
-        ],
-        "Episodes 201-300": [
-            "BAACAgUAAxkBAAECMPhosXwwKklH_Y6JWhYe55JCz6m2FwACWgQAAtElEFS807I684w6fzYE",
-            "BAACAgUAAxkBAAECMPlosXww0dsCuoprMJWZd0RkXhRytQACrwQAAtElEFQ_VycAAaentvs2BA"
-        ],
-        "Episodes 301-400": [
-            "Your_Video_ID",
-            "Your_Video_ID",
-            ],
-        "Episodes 401-500": [
-            "Your_Video_ID",
-            "Your_Video_ID",
-            ],
-        "Episodes 501-600": [
-            "Your_Video_ID",
-            "Your_Video_ID",
-            ],
-        "Episodes 601-700": [
-            "Your_Video_ID",
-            "Your_Video_ID",
-            ],
-        "Episodes 701-800": [
-            "Your_Video_ID",
-            "Your_Video_ID",
-            ],
-        "Episodes 801-900": [
-            "Your_Video_ID",
-            "Your_Video_ID",
-            ],
-        "Episodes 901-1000": [
-            "Your_Video_ID",
-            "Your_Video_ID",
-            ],
-        "Episodes 1001-1100": [
-            "Your_Video_ID",
-            "Your_Video_ID",
-            ],
-        "Episodes 1101-Ongoing": [
-            "Your_Video_ID",
-            "Your_Video_ID"
-            ],
-    }
-
-    video_ids = video_lists.get(series_name, [])
-
-    if not video_ids or "YOUR_VIDEO_ID_HERE" in video_ids:
-        logger.warning(f"No video IDs found or placeholders present for series: {series_name}")
-        await context.bot.send_message(chat_id=chat_id, text=f"Sorry, no videos are available for {series_name} yet.")
-        return
-
-    for i, video_id in enumerate(video_ids, start=start_episode):
-        try:
-            # Send the video and store the returned message object
-            sent_message = await context.bot.send_video(
-                chat_id=chat_id,
-                video=video_id,
-                caption=(
-                    f"Episode {i}\n\n"
-                    "(Copyright ကြောင့် 24 Hours အတွင်းပြန်ဖျက်ပါမယ်)\n"
-                    "(_____ /start နှိပ်ပြီး ကြည့်ပေးပါရန် _____)\n\n"
-                    "1xBet/MLBB Diamond\n"
-                    "ထည့်ရန် အောက်က BOT မှာ\n"
-                    "အားပေးလို့ရပါတယ်ဗျ\n"
-                    "@NSA_Game_Shopbot"
-                )
-            )
-
-            # Schedule the message for deletion using the config variable
-            context.job_queue.run_once(
-                delete_message_callback,
-                when=DELETION_DELAY_SECONDS,
-                data={"chat_id": chat_id, "message_id": sent_message.message_id},
-                name=f"delete_{chat_id}_{sent_message.message_id}"
-            )
-            # Add a small delay to avoid hitting Telegram's rate limits
-            await asyncio.sleep(0)
-        except Exception as e:
-            logger.error(f"Failed to send video {video_id} for episode {i}: {e}")
-
-
-# --- Button Click Handler ---
-async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Handles button clicks by generating and sending a deep link message."""
-    query = update.callback_query
-    await query.answer() # Acknowledge the button press
-
-    bot_username = (await context.bot.get_me()).username
-
-    button_map = {
-        'ep_1-100': ('onepiece_1-100', "Episodes 1-100"),
-        'ep_101-200': ('onepiece_101-200', "Episodes 101-200"),
-        'ep_201-300': ('onepiece_201-300', "Episodes 201-300"),
-        'ep_301-400': ('onepiece_301-400', "Episodes 301-400"),
-        'ep_401-500': ('onepiece_401-500', "Episodes 401-500"),
-        'ep_501-600': ('onepiece_501-600', "Episodes 501-600"),
-        'ep_601-700': ('onepiece_601-700', "Episodes 601-700"),
-        'ep_701-800': ('onepiece_701-800', "Episodes 701-800"),
-        'ep_801-900': ('onepiece_801-900', "Episodes 801-900"),
-        'ep_901-1000': ('onepiece_901-1000', "Episodes 901-1000"),
-        'ep_1001-1100': ('onepiece_1001-1100', "Episodes 1001-1100"),
-        'ep_1101-Ongoing': ('onepiece_1101-Ongoing', "Episodes 1101-Ongoing"),
-    }
-
-    if query.data in button_map:
-        payload, button_text = button_map[query.data]
-        deep_link = f"https://t.me/{bot_username}?start={payload}"
-        message_text = (
-            f"{button_text} ကို ကြည့်ရန် အောက်က link ကိုနှိပ်ပါ။\n\n"
-            f"{deep_link}"
-        )
-        await context.bot.send_message(chat_id=query.message.chat_id, text=message_text)
-        
-
-# --- Main Bot Function (UPDATED FOR RENDER) ---
-def main() -> None:
-    """Starts the bot in webhook mode for server or polling mode for local."""
-    token =("7893558945:AAG-DGexBsIh6cAGWaWI92rxzTW1O8CWhSs")
-    if not token:
-        logger.critical("FATAL: TELEGRAM_TOKEN environment variable not set!")
-        return
-    
-    # NEW: Use an environment variable for the persistence file path
-    # This allows us to place it on a persistent disk on Render
-    persistence_path = os.environ.get("PERSISTENCE_PATH", "bot_persistence")
-    persistence = PicklePersistence(filepath=persistence_path)
-
-    application = Application.builder().token(token).persistence(persistence).build()
-
-    application.add_handler(CommandHandler("start", start))
-    application.add_handler(CallbackQueryHandler(button_handler))
-
-    # --- NEW: Webhook vs. Polling Logic ---
-    webhook_url = os.environ.get("RENDER_EXTERNAL_URL")
-    if webhook_url:
-        # Running on Render (or any server with this env var)
-        port = int(os.environ.get("PORT", 8443))
-        logger.info(f"Starting bot in webhook mode on port {port}")
-        application.run_webhook(
-            listen="0.0.0.0",
-            port=port,
-            url_path=token, # Use token as a secret path
-            webhook_url=f"{webhook_url}/{token}"
-        )
-    else:
-        # Running locally
-        logger.info("Starting bot in polling mode for local development")
-        application.run_polling()
-
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+import asyncio
+import bisect
+import contextlib
+import contextvars
+import functools
+import glob
+import itertools
+import json
+import logging
+import math
+import multiprocessing
+import os
+import pickle
+import signal
+import sqlite3
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass
+from datetime import timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, Optional, Tuple
+from telegram import (
+    Bot,
+    Update,
+    InlineKeyboardButton,
+    InlineKeyboardMarkup,
+    InlineQueryResultCachedVideo,
+    InputMediaVideo,
+)
+from telegram.constants import BulkRequestLimit, InlineQueryLimit, MediaGroupLimit
+from telegram.error import BadRequest, Forbidden, NetworkError, RetryAfter
+from telegram.ext import (
+    Application,
+    BasePersistence,
+    BaseRateLimiter,
+    BaseUpdateProcessor,
+    CommandHandler,
+    CallbackQueryHandler,
+    ContextTypes,
+    InlineQueryHandler,
+    PersistenceInput,
+)
+
+# Deletion delay in seconds (24 hours = 86400)
+DELETION_DELAY_SECONDS = 86400
+# Deletions expiring within the same window are swept together by one job
+EXPIRY_BUCKET_SECONDS = 60
+# Delay before retrying a deleteMessages call that failed with a transient error
+EXPIRY_RETRY_SECONDS = 300
+
+# On-disk ledger of pending deletions, so they survive restarts and redeploys.
+# Appends are flushed every LEDGER_FLUSH_SECONDS and the file is rewritten every LEDGER_COMPACT_SECONDS.
+LEDGER_PATH = os.environ.get("LEDGER_PATH", "deletion_ledger")
+LEDGER_FLUSH_SECONDS = 2
+LEDGER_COMPACT_SECONDS = 3600
+
+# How often (in seconds) changed user/chat/bot data is written to the SQLite persistence
+PERSISTENCE_FLUSH_SECONDS = 10
+
+# Number of bot processes behind the webhook; above 1, updates are sharded across them by chat_id
+WEBHOOK_WORKERS = int(os.environ.get("WEBHOOK_WORKERS", 1))
+
+# How long (in seconds) Telegram may cache the answer to an inline search query
+INLINE_CACHE_SECONDS = 300
+
+# Interactive updates handled at once, and episode batches being sent at once across all chats
+MAX_CONCURRENT_UPDATES = 256
+BULK_SEND_SLOTS = int(os.environ.get("BULK_SEND_SLOTS", 32))
+
+# Port for the Prometheus /metrics endpoint (unset disables it). Sharded webhook workers use METRICS_PORT + index.
+METRICS_PORT = os.environ.get("METRICS_PORT")
+
+# Episode catalog file and how often (in seconds) it is checked for changes
+CATALOG_PATH = os.environ.get("CATALOG_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "catalog.json"))
+CATALOG_RELOAD_SECONDS = 10
+
+# Outbound send budgets (messages per second). Telegram allows about 30/s overall,
+# about 1/s in a single private chat (with short bursts) and 20/min in a group.
+GLOBAL_SEND_RATE = float(os.environ.get("GLOBAL_SEND_RATE", 30))
+CHAT_SEND_RATE = float(os.environ.get("CHAT_SEND_RATE", 1))
+CHAT_SEND_BURST = 3
+GROUP_SEND_RATE = 20 / 60
+
+# How episodes are delivered: "video" sends one message per episode,
+# "album" sends media groups of up to 10 episodes per request,
+# "copy" copies up to 100 posts per request from the series' storage channel
+DELIVERY_MODE = os.environ.get("DELIVERY_MODE", "video")
+
+# Episodes sent per deep-link click before a "Next" button is shown (0 sends the whole range)
+PAGE_SIZE = int(os.environ.get("PAGE_SIZE", 0))
+
+WELCOME_MESSAGE = ("Hello 👋\n\nကြိုက်နှစ်သက်ရာ Season အလိုက်နှိပ်ပါ။"
+                   "\nMain Channel လေးကိုလဲ Joinထားပေးပါနော်"
+                   "\n@Naruto_MainChannel")
+
+EPISODE_CAPTION = (
+    "Episode {episode}\n\n"
+    "(Copyright ကြောင့် 24 Hours အတွင်းပြန်ဖျက်ပါမယ်)\n"
+    "(_____ /start နှိပ်ပြီး ကြည့်ပေးပါရန် _____)\n\n"
+    "1xBet/MLBB Diamond\n"
+    "ထည့်ရန် အောက်က BOT မှာ\n"
+    "အားပေးလို့ရပါတယ်ဗျ\n"
+    "@NSA_Game_Shopbot"
+)
+
+# Inline results are posted by the user, not the bot, so they cannot be deleted and carry no deletion notice
+INLINE_CAPTION = (
+    "Episode {episode}\n\n"
+    "(_____ /start နှိပ်ပြီး ကြည့်ပေးပါရန် _____)\n\n"
+    "1xBet/MLBB Diamond\n"
+    "ထည့်ရန် အောက်က BOT မှာ\n"
+    "အားပေးလို့ရပါတယ်ဗျ\n"
+    "@NSA_Game_Shopbot"
+)
+
+# --- Logging Setup ---
+logging.basicConfig(
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s", level=logging.INFO
+)
+logger = logging.getLogger(__name__)
+# httpx logs every Bot API request and APScheduler every job run at INFO; keep those out of the hot path
+logging.getLogger("httpx").setLevel(logging.WARNING)
+logging.getLogger("apscheduler").setLevel(logging.WARNING)
+
+
+# --- Metrics ---
+class Metrics:
+    """
+    Counters, histograms and gauges rendered in the Prometheus text format.
+    Values are updated on the event loop and read by the metrics server thread.
+    """
+
+    LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+
+    def __init__(self):
+        self.help = {}
+        self.counters = {}    # name -> {labels: value}
+        self.histograms = {}  # name -> {labels: [count per bucket..., count above the last bucket, sum, count]}
+        self.gauges = {}      # name -> function returning the current value
+
+    def inc(self, name: str, amount: float = 1, **labels) -> None:
+        series = self.counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        series = self.histograms.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        counts = series.get(key)
+        if counts is None:
+            counts = series[key] = [0] * (len(self.LATENCY_BUCKETS) + 3)
+        counts[bisect.bisect_left(self.LATENCY_BUCKETS, value)] += 1
+        counts[-2] += value
+        counts[-1] += 1
+
+    def gauge(self, name: str, help_text: str, read) -> None:
+        self.help[name] = help_text
+        self.gauges[name] = read
+
+    def timed(self, name: str):
+        """Decorator recording how long each call of an async handler takes in telebot_handler_seconds."""
+        def decorator(callback):
+            @functools.wraps(callback)
+            async def wrapper(*args, **kwargs):
+                started = time.perf_counter()
+                try:
+                    return await callback(*args, **kwargs)
+                finally:
+                    self.observe("telebot_handler_seconds", time.perf_counter() - started, handler=name)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def _labels(labels: tuple, extra: str = "") -> str:
+        parts = [f'{key}="{value}"' for key, value in labels]
+        if extra:
+            parts.append(extra)
+        return "{" + ",".join(parts) + "}" if parts else ""
+
+    def render(self) -> str:
+        lines = []
+        for name, series in list(self.counters.items()):
+            lines += [f"# HELP {name} {self.help.get(name, name)}", f"# TYPE {name} counter"]
+            lines += [f"{name}{self._labels(labels)} {value}" for labels, value in list(series.items())]
+        for name, series in list(self.histograms.items()):
+            lines += [f"# HELP {name} {self.help.get(name, name)}", f"# TYPE {name} histogram"]
+            for labels, counts in list(series.items()):
+                counts = list(counts)
+                cumulative = 0
+                for bound, count in zip(self.LATENCY_BUCKETS + ("+Inf",), counts[:-2]):
+                    cumulative += count
+                    le = f'le="{bound}"'
+                    lines.append(f"{name}_bucket{self._labels(labels, le)} {cumulative}")
+                lines.append(f"{name}_sum{self._labels(labels)} {counts[-2]}")
+                lines.append(f"{name}_count{self._labels(labels)} {counts[-1]}")
+        for name, read in list(self.gauges.items()):
+            lines += [f"# HELP {name} {self.help[name]}", f"# TYPE {name} gauge", f"{name} {read()}"]
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+metrics.help.update({
+    "telebot_handler_seconds": "Time spent in each update handler and in background range sends.",
+    "telebot_api_requests_total": "Bot API requests (sends, deletes, getMe, ...) by endpoint and result "
+                                  "(ok, error, retry_after).",
+})
+
+
+def start_metrics_server(port: int) -> None:
+    """Serves GET /metrics on `port` from a daemon thread, next to the webhook or polling loop."""
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path != "/metrics":
+                self.send_error(404)
+                return
+            body = metrics.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    server = ThreadingHTTPServer(("0.0.0.0", port), MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.info(f"Serving metrics on port {port}")
+
+
+# --- Episode Catalog ---
+# Menu buttons of this series predate multi-series catalogs, so they keep their bare ep_<label> callback data
+LEGACY_CALLBACK_SERIES = "onepiece"
+
+
+@dataclass(frozen=True)
+class EpisodeRange:
+    """One menu entry, e.g. One Piece episodes 1-100. `end` is None while the range is ongoing."""
+    series: str
+    title: str
+    start: int
+    end: Optional[int]
+
+    @property
+    def label(self) -> str:
+        return f"{self.start}-{self.end if self.end is not None else 'Ongoing'}"
+
+    @property
+    def series_name(self) -> str:
+        return f"Episodes {self.label}"
+
+    @property
+    def payload(self) -> str:
+        return f"{self.series}_{self.label}"
+
+    @property
+    def callback_data(self) -> str:
+        if self.series == LEGACY_CALLBACK_SERIES:
+            return f"ep_{self.label}"
+        return f"ep_{self.series}_{self.label}"
+
+    @property
+    def button_text(self) -> str:
+        end = self.end if self.end is not None else "Ongoing"
+        return f"{self.title} ({self.start} - {end}) ကြည့်ရန် နှိပ်ပါ"
+
+
+class Catalog:
+    """
+    Episode file IDs loaded from a JSON file into an index keyed by series and episode number.
+    The file is re-read only when its modification time changes.
+
+    Each series entry has a "title", menu "ranges" ([start, end], end null while ongoing) and
+    "episodes" (number -> file_id). An optional "storage" entry ({"chat_id": ..., "messages":
+    {number: message_id}}) lists the episodes' posts in a private channel for "copy" delivery.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._mtime = None
+        self._episodes = {}   # series -> {episode number: file_id}
+        self._numbers = {}    # series -> sorted episode numbers, for range lookups
+        self._storage = {}    # series -> (storage channel id, {episode number: message_id})
+        self.ranges = []
+        self.ranges_by_payload = {}
+        self.ranges_by_callback = {}
+        self.menu_markup = InlineKeyboardMarkup([])
+        self._series_by_prefix = {}   # prefix of a series key or title -> set of series
+        self._results_by_number = {}  # prefix of an episode number -> inline results, in episode order
+        self._results_by_series = {}  # series -> inline results, in episode order
+
+    def load(self) -> None:
+        """Reads the catalog file and swaps in the new index in one step."""
+        mtime = os.stat(self.path).st_mtime_ns
+        with open(self.path, encoding="utf-8") as f:
+            data = json.load(f)
+
+        episodes, numbers, ranges, storage = {}, {}, [], {}
+        series_by_prefix, results_by_number, results_by_series = {}, {}, {}
+        for series, entry in data.items():
+            title = entry.get("title", series)
+            series_episodes = {int(number): file_id for number, file_id in entry.get("episodes", {}).items()}
+            episodes[series] = series_episodes
+            numbers[series] = sorted(series_episodes)
+            for start, end in entry.get("ranges", []):
+                ranges.append(EpisodeRange(series, title, start, end))
+            if entry.get("storage"):
+                storage_messages = {int(number): message_id for number, message_id in entry["storage"]["messages"].items()}
+                storage[series] = (entry["storage"]["chat_id"], storage_messages)
+
+            # Index the key and the title, and the title from each of its words on ("piece" finds "One Piece")
+            words = title.split()
+            for name in {series, *(" ".join(words[i:]) for i in range(len(words)))}:
+                name = self._normalize(name)
+                for length in range(1, len(name) + 1):
+                    series_by_prefix.setdefault(name[:length], set()).add(series)
+            for number in numbers[series]:
+                result = InlineQueryResultCachedVideo(
+                    id=f"{series}:{number}",
+                    video_file_id=series_episodes[number],
+                    title=f"{title} - Episode {number}",
+                    caption=INLINE_CAPTION.format(episode=number),
+                )
+                results_by_series.setdefault(series, []).append(result)
+                digits = str(number)
+                for length in range(1, len(digits) + 1):
+                    results_by_number.setdefault(digits[:length], []).append((number, series, result))
+        for results in results_by_number.values():
+            results.sort(key=lambda item: item[:2])
+
+        self._episodes = episodes
+        self._numbers = numbers
+        self._storage = storage
+        self.ranges = ranges
+        self.ranges_by_payload = {r.payload: r for r in ranges}
+        self.ranges_by_callback = {r.callback_data: r for r in ranges}
+        self.menu_markup = InlineKeyboardMarkup(
+            [[InlineKeyboardButton(r.button_text, callback_data=r.callback_data)] for r in ranges]
+        )
+        self._series_by_prefix = series_by_prefix
+        self._results_by_number = results_by_number
+        self._results_by_series = results_by_series
+        self._mtime = mtime
+        logger.info(f"Loaded catalog from {self.path}: "
+                    f"{sum(len(e) for e in episodes.values())} episodes, {len(ranges)} ranges.")
+
+    def reload_if_changed(self) -> bool:
+        """Reloads the catalog if the file changed on disk. A broken file keeps the old index."""
+        try:
+            if os.stat(self.path).st_mtime_ns == self._mtime:
+                return False
+            self.load()
+            return True
+        except (OSError, ValueError, TypeError) as e:
+            logger.error(f"Failed to reload catalog from {self.path}: {e}")
+            return False
+
+    def episodes(self, series: str, start: int, end: Optional[int] = None) -> Iterator[Tuple[int, str]]:
+        """Yields (episode number, file_id) pairs for the episodes of `series` in [start, end]."""
+        numbers = self._numbers.get(series, [])
+        series_episodes = self._episodes.get(series, {})
+        first = bisect.bisect_left(numbers, start)
+        last = len(numbers) if end is None else bisect.bisect_right(numbers, end)
+        for number in numbers[first:last]:
+            yield number, series_episodes[number]
+
+    def storage_chat(self, series: str):
+        """The storage channel holding posts of `series`, or None if it has none."""
+        return self._storage.get(series, (None, {}))[0]
+
+    def storage_message(self, series: str, number: int) -> Optional[int]:
+        """The storage channel post of an episode, or None if it was not posted there."""
+        return self._storage.get(series, (None, {}))[1].get(number)
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return "".join(c for c in text.lower() if c.isalnum())
+
+    def search(self, query: str, limit: int = InlineQueryLimit.RESULTS) -> list:
+        """
+        Inline results for a query like "1045", "one piece 10" or "one".
+        The words, joined, narrow down the series by prefix. A number matches episodes whose number starts with it.
+        """
+        words, number = [], None
+        for token in query.split():
+            if token.isdigit():
+                number = token.lstrip("0") or "0"
+            elif normalized := self._normalize(token):
+                words.append(normalized)
+
+        series = self._series_by_prefix.get("".join(words), set()) if words else None
+        if series is not None and not series:
+            return []
+
+        if number is None:
+            if series is None:
+                return []
+            results = itertools.chain.from_iterable(self._results_by_series.get(s, []) for s in sorted(series))
+            return list(itertools.islice(results, limit))
+        candidates = self._results_by_number.get(number, [])
+        return list(itertools.islice((result for _, s, result in candidates if series is None or s in series), limit))
+
+
+catalog = Catalog(CATALOG_PATH)
+
+
+async def reload_catalog_callback(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Repeating job that picks up catalog edits without a restart."""
+    catalog.reload_if_changed()
+
+
+# --- Outbound Send Scheduler ---
+class TokenBucket:
+    """Hands out `rate` tokens per second, holding at most `capacity`. Waiters are served in FIFO order."""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.priority_waiting = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def _take(self, reserved) -> None:
+        """Takes a token once one is left over after the `reserved()` tokens held back for others."""
+        while True:
+            now = time.monotonic()
+            if now < self.blocked_until:
+                await asyncio.sleep(self.blocked_until - now)
+                continue
+            self._refill(now)
+            needed = 1 + reserved()
+            if self.tokens >= needed:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((needed - self.tokens) / self.rate)
+
+    async def acquire(self, priority: bool = False) -> None:
+        """
+        Waits for a token. Priority callers skip the FIFO queue: queued callers leave a token for each
+        waiting priority caller. Nobody goes into debt, so the bucket never hands out more than its rate.
+        """
+        if priority:
+            self.priority_waiting += 1
+            try:
+                await self._take(lambda: 0)
+            finally:
+                self.priority_waiting -= 1
+            return
+
+        async with self._lock:
+            await self._take(lambda: self.priority_waiting)
+
+    def block(self, seconds: float) -> None:
+        """Hands out no tokens for the next `seconds` (used after a RetryAfter)."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+
+    def is_idle(self) -> bool:
+        now = time.monotonic()
+        self._refill(now)
+        return self.tokens >= self.capacity and now >= self.blocked_until and not self._lock.locked()
+
+
+# Set while a request is made from the bulk send lane, so the rate limiter serves it after interactive replies
+bulk_send = contextvars.ContextVar("bulk_send", default=False)
+
+
+class SendScheduler(BaseRateLimiter):
+    """
+    Rate limiter plugged into the bot, so every `context.bot.send_*` call goes through it.
+    - Send-type requests wait for a token from their chat's bucket and then from the global bucket.
+      Interactive replies go ahead of queued bulk sends.
+    - On RetryAfter the chat's bucket is paused and the request is queued again instead of failing.
+    """
+
+    MAX_IDLE_CHAT_BUCKETS = 1024
+
+    def __init__(self, global_rate: float = GLOBAL_SEND_RATE, chat_rate: float = CHAT_SEND_RATE,
+                 chat_burst: float = CHAT_SEND_BURST, group_rate: float = GROUP_SEND_RATE):
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.group_rate = group_rate
+        self.chat_buckets = {}
+        self.waiting = 0
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+    def _chat_bucket(self, chat_id: Any) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= self.MAX_IDLE_CHAT_BUCKETS:
+                self.chat_buckets = {k: b for k, b in self.chat_buckets.items() if not b.is_idle()}
+            is_group = isinstance(chat_id, str) or (isinstance(chat_id, int) and chat_id < 0)
+            if is_group:
+                bucket = TokenBucket(self.group_rate, 1)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    async def process_request(self, callback, args, kwargs, endpoint, data, rate_limit_args):
+        chat_id = data.get("chat_id")
+        try:
+            chat_id = int(chat_id)
+        except (TypeError, ValueError):
+            pass
+        throttled = chat_id is not None and endpoint.startswith(("send", "copy", "forward"))
+        priority = not bulk_send.get()
+
+        while True:
+            if throttled:
+                self.waiting += 1
+                try:
+                    await self._chat_bucket(chat_id).acquire(priority)
+                    await self.global_bucket.acquire(priority)
+                finally:
+                    self.waiting -= 1
+            try:
+                result = await callback(*args, **kwargs)
+                metrics.inc("telebot_api_requests_total", endpoint=endpoint, result="ok")
+                return result
+            except RetryAfter as e:
+                metrics.inc("telebot_api_requests_total", endpoint=endpoint, result="retry_after")
+                # An int, or a timedelta when PTB_TIMEDELTA is set
+                retry_after = e.retry_after
+                seconds = retry_after.total_seconds() if isinstance(retry_after, timedelta) else float(retry_after)
+                logger.warning(f"Flood limit hit on {endpoint} for chat {chat_id}; retrying in {seconds}s.")
+                if throttled:
+                    self._chat_bucket(chat_id).block(seconds + 0.1)
+                else:
+                    await asyncio.sleep(seconds + 0.1)
+            except Exception:
+                metrics.inc("telebot_api_requests_total", endpoint=endpoint, result="error")
+                raise
+
+
+# --- Update Scheduling ---
+class PriorityUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes updates concurrently. Interactive ones (commands, button presses, inline queries) start
+    right away; anything else shares a small bounded lane so it cannot crowd them out.
+    Updates from the same chat still run one at a time, in the order they arrived.
+    """
+
+    def __init__(self, max_concurrent_updates: int = MAX_CONCURRENT_UPDATES, background_limit: int = 8):
+        super().__init__(max_concurrent_updates)
+        self._background = asyncio.BoundedSemaphore(background_limit)
+        self._chat_locks = {}  # chat_id -> [lock, updates holding or waiting for it]
+
+    @staticmethod
+    def is_interactive(update: object) -> bool:
+        if not isinstance(update, Update):
+            return False
+        if update.callback_query or update.inline_query:
+            return True
+        return bool(update.message and update.message.text and update.message.text.startswith("/"))
+
+    @contextlib.asynccontextmanager
+    async def _chat_turn(self, update: object):
+        """Waits until the earlier updates of the update's chat are done. asyncio.Lock wakes waiters in FIFO order."""
+        chat = update.effective_chat if isinstance(update, Update) else None
+        if chat is None:
+            yield
+            return
+        entry = self._chat_locks.setdefault(chat.id, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._chat_locks[chat.id]
+
+    async def do_process_update(self, update: object, coroutine) -> None:
+        async with self._chat_turn(update):
+            if self.is_interactive(update):
+                await coroutine
+            else:
+                async with self._background:
+                    await coroutine
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        pass
+
+
+class BulkSendLane:
+    """
+    Bounded pool of slots for sending episode batches. Waiting chats are served round-robin, so a chat
+    in the middle of a long range gets one batch per turn and a newly arrived chat is not stuck behind it.
+    """
+
+    def __init__(self, slots: int = BULK_SEND_SLOTS):
+        self.free = slots
+        self.waiters = {}     # chat_id -> deque of futures waiting for a slot
+        self.order = deque()  # chats with waiters, in round-robin order
+
+    @contextlib.asynccontextmanager
+    async def slot(self, chat_id: int):
+        if self.free > 0 and not self.order:
+            self.free -= 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            if chat_id not in self.waiters:
+                self.waiters[chat_id] = deque()
+                self.order.append(chat_id)
+            self.waiters[chat_id].append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # The slot was handed over just as we were cancelled; pass it on
+                    self._release()
+                raise
+        token = bulk_send.set(True)
+        try:
+            yield
+        finally:
+            bulk_send.reset(token)
+            self._release()
+
+    def _release(self) -> None:
+        """Hands the freed slot to the next chat in line, or returns it to the pool."""
+        while self.order:
+            chat_id = self.order.popleft()
+            waiters = self.waiters[chat_id]
+            waiter = waiters.popleft()
+            if waiters:
+                self.order.append(chat_id)
+            else:
+                del self.waiters[chat_id]
+            if not waiter.cancelled():
+                waiter.set_result(None)
+                return
+        self.free += 1
+
+
+bulk_lane = BulkSendLane()
+
+
+# --- Message Expiry ---
+class DeletionLedger:
+    """
+    Append-only file of scheduled deletions. Each line is one of:
+    - `+ <bucket> <chat_id> <message_id> [<message_id> ...]` when messages are scheduled
+    - `- <bucket>` once that bucket has been swept
+    Lines are buffered in memory and written in batches by `flush`.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._buffer = []
+
+    def record(self, bucket: int, chat_id: int, message_ids) -> None:
+        self._buffer.append(f"+ {bucket} {chat_id} {' '.join(map(str, message_ids))}\n")
+
+    def record_swept(self, bucket: int) -> None:
+        self._buffer.append(f"- {bucket}\n")
+
+    def flush(self) -> None:
+        """Appends the buffered lines and fsyncs the file."""
+        if not self._buffer:
+            return
+        lines, self._buffer = self._buffer, []
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.writelines(lines)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def replay(self) -> dict:
+        """Reads the ledger back into {bucket: {chat_id: [message_id, ...]}}, leaving out swept buckets."""
+        buckets = {}
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    parts = line.split()
+                    try:
+                        if parts[0] == "+" and len(parts) >= 4:
+                            chats = buckets.setdefault(int(parts[1]), {})
+                            chats.setdefault(int(parts[2]), []).extend(int(m) for m in parts[3:])
+                        elif parts[0] == "-" and len(parts) == 2:
+                            buckets.pop(int(parts[1]), None)
+                    except (IndexError, ValueError):
+                        # A torn last line from a crash mid-write; everything before it is intact
+                        logger.warning(f"Skipping malformed ledger line: {line!r}")
+        except FileNotFoundError:
+            pass
+        return buckets
+
+    def compact(self, buckets: dict) -> None:
+        """Rewrites the ledger so it holds only the deletions in `buckets` that are still pending."""
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for bucket, chats in buckets.items():
+                for chat_id, message_ids in chats.items():
+                    f.write(f"+ {bucket} {chat_id} {' '.join(map(str, message_ids))}\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._buffer = []
+
+
+class ExpiryEngine:
+    """
+    Pending deletions grouped by expiry bucket and then by chat.
+    Each bucket has a single JobQueue job, and its sweep removes up to 100 messages per API call.
+    """
+
+    def __init__(self, bucket_seconds: int = EXPIRY_BUCKET_SECONDS):
+        self.bucket_seconds = bucket_seconds
+        self.buckets = {}  # bucket time (unix seconds) -> {chat_id: [message_id, ...]}
+        self.pending = 0   # message IDs across all buckets, kept up to date for the metrics endpoint
+        self.ledger = None
+
+    def schedule(self, job_queue, chat_id: int, message_ids, delay: float = DELETION_DELAY_SECONDS) -> None:
+        """Queues `message_ids` in `chat_id` for deletion after `delay` seconds (rounded up to the bucket)."""
+        bucket = math.ceil((time.time() + delay) / self.bucket_seconds) * self.bucket_seconds
+        self._bucket(job_queue, bucket).setdefault(chat_id, []).extend(message_ids)
+        self.pending += len(message_ids)
+        if self.ledger:
+            self.ledger.record(bucket, chat_id, message_ids)
+
+    def _bucket(self, job_queue, bucket: int) -> dict:
+        chats = self.buckets.get(bucket)
+        if chats is None:
+            chats = self.buckets[bucket] = {}
+            job_queue.run_once(
+                expiry_sweep_callback, when=max(0.0, bucket - time.time()), data=bucket, name=f"expire_{bucket}"
+            )
+        return chats
+
+    def restore(self, job_queue, ledger: Optional[DeletionLedger] = None) -> None:
+        """
+        Re-schedules the deletions recorded in `ledger` (by default our own). Overdue buckets are swept right away.
+        """
+        ledger = ledger or self.ledger
+        if not ledger:
+            return
+        restored = ledger.replay()
+        count = 0
+        for bucket, chats in restored.items():
+            pending = self._bucket(job_queue, bucket)
+            for chat_id, message_ids in chats.items():
+                pending.setdefault(chat_id, []).extend(message_ids)
+                count += len(message_ids)
+        self.pending += count
+        overdue = sum(1 for bucket in restored if bucket <= time.time())
+        logger.info(f"Restored {count} pending deletions ({overdue} overdue buckets) from {ledger.path}.")
+
+    async def sweep(self, bot, job_queue, bucket: int) -> None:
+        """
+        Deletes every message in `bucket`, one deleteMessages call per chat per 100 IDs.
+        A call that fails for a transient reason is moved to a later bucket (and the ledger) to be retried;
+        BadRequest and Forbidden are permanent (messages already gone, bot removed from the chat) and only logged.
+        """
+        chats = self.buckets.pop(bucket, {})
+        self.pending -= sum(len(message_ids) for message_ids in chats.values())
+        for chat_id, message_ids in chats.items():
+            for i in range(0, len(message_ids), BulkRequestLimit.MAX_LIMIT):
+                batch = message_ids[i:i + BulkRequestLimit.MAX_LIMIT]
+                try:
+                    await bot.delete_messages(chat_id=chat_id, message_ids=batch)
+                    logger.debug(f"Deleted {len(batch)} messages from chat {chat_id}.")
+                except (BadRequest, Forbidden) as e:
+                    logger.error(f"Failed to delete {len(batch)} messages in chat {chat_id}: {e}")
+                except Exception as e:
+                    logger.warning(f"Failed to delete {len(batch)} messages in chat {chat_id}: {e}; "
+                                   f"retrying in {EXPIRY_RETRY_SECONDS}s.")
+                    self.schedule(job_queue, chat_id, batch, delay=EXPIRY_RETRY_SECONDS)
+        # Retries were recorded above, so the ledger still holds them once this bucket is marked swept
+        if self.ledger:
+            self.ledger.record_swept(bucket)
+
+
+expiry = ExpiryEngine()
+
+
+async def expiry_sweep_callback(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """JobQueue callback that deletes all messages whose expiry falls in the job's bucket."""
+    await expiry.sweep(context.bot, context.job_queue, context.job.data)
+
+
+async def flush_ledger_callback(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Repeating job that writes out buffered ledger lines."""
+    expiry.ledger.flush()
+
+
+async def compact_ledger_callback(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Repeating job that rewrites the ledger from the deletions still pending in memory."""
+    expiry.ledger.compact(expiry.buckets)
+
+
+async def post_init(application: Application, worker: int = 0, workers: int = 1) -> None:
+    """
+    Replays the deletion ledger once the bot is initialized, before updates are processed.
+    Ledgers left behind under a different WEBHOOK_WORKERS are adopted into it.
+    """
+    adopted = adopt_orphaned_ledgers(application.job_queue, worker, workers)
+    expiry.restore(application.job_queue)
+    # Rewriting the file also drops a line torn by a crash, so new appends start on a clean line.
+    # It now holds the adopted deletions too, so their files can go.
+    expiry.ledger.compact(expiry.buckets)
+    for path in adopted:
+        os.remove(path)
+
+
+async def post_shutdown(application: Application) -> None:
+    """Writes out any ledger lines still buffered when the bot stops."""
+    expiry.ledger.flush()
+
+
+# --- Persistence ---
+class SQLitePersistence(BasePersistence):
+    """
+    Stores user_data, chat_data and bot_data in SQLite (WAL mode), one pickled row per user or chat.
+    - Only bot_data is read at startup. A chat's or user's row is loaded the first time it is used.
+    - Changed rows are staged in memory and upserted together in one transaction off the event loop.
+      The Application hands them over every `update_interval` seconds, so that is the flush interval.
+    """
+
+    def __init__(self, path: str, update_interval: float = PERSISTENCE_FLUSH_SECONDS):
+        super().__init__(store_data=PersistenceInput(callback_data=False), update_interval=update_interval)
+        self.path = path
+        self._reader = self._connect()
+        self._writer = self._connect(check_same_thread=False)
+        self._writer.executescript("""
+            CREATE TABLE IF NOT EXISTS user_data (id INTEGER PRIMARY KEY, data BLOB NOT NULL);
+            CREATE TABLE IF NOT EXISTS chat_data (id INTEGER PRIMARY KEY, data BLOB NOT NULL);
+            CREATE TABLE IF NOT EXISTS bot_data (id INTEGER PRIMARY KEY CHECK (id = 0), data BLOB NOT NULL);
+            CREATE TABLE IF NOT EXISTS conversations (
+                name TEXT NOT NULL, key TEXT NOT NULL, state BLOB NOT NULL, PRIMARY KEY (name, key)
+            );
+        """)
+        self._loaded = {"user_data": set(), "chat_data": set()}
+        self._pending = {"user_data": {}, "chat_data": {}, "conversations": {}}  # None marks a deleted row
+        self._pending_bot_data = None
+        self._written_bot_data = None
+        self._commit_task = None
+        self._write_lock = threading.Lock()
+
+    def _connect(self, check_same_thread: bool = True) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=check_same_thread)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _load_row(self, table: str, row_id: int) -> Optional[dict]:
+        row = self._reader.execute(f"SELECT data FROM {table} WHERE id = ?", (row_id,)).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def _load_once(self, table: str, row_id: int, data: dict) -> None:
+        """Fills `data` from the stored row the first time `row_id` is seen in this process."""
+        if row_id in self._loaded[table]:
+            return
+        self._loaded[table].add(row_id)
+        stored = self._load_row(table, row_id)
+        if stored:
+            data.update({key: value for key, value in stored.items() if key not in data})
+
+    # Reads
+    async def get_user_data(self) -> dict:
+        return {}
+
+    async def get_chat_data(self) -> dict:
+        return {}
+
+    async def get_bot_data(self) -> dict:
+        return self._load_row("bot_data", 0) or {}
+
+    async def get_callback_data(self) -> None:
+        return None
+
+    async def get_conversations(self, name: str) -> dict:
+        rows = self._reader.execute("SELECT key, state FROM conversations WHERE name = ?", (name,))
+        return {tuple(json.loads(key)): pickle.loads(state) for key, state in rows}
+
+    async def refresh_user_data(self, user_id: int, user_data: dict) -> None:
+        self._load_once("user_data", user_id, user_data)
+
+    async def refresh_chat_data(self, chat_id: int, chat_data: dict) -> None:
+        self._load_once("chat_data", chat_id, chat_data)
+
+    async def refresh_bot_data(self, bot_data: dict) -> None:
+        pass
+
+    # Writes
+    def _stage(self, table: str, row_id, data) -> None:
+        self._pending[table][row_id] = data
+        self._schedule_commit()
+
+    def _schedule_commit(self) -> None:
+        if self._commit_task is None:
+            self._commit_task = asyncio.create_task(self._commit())
+
+    async def update_user_data(self, user_id: int, data: dict) -> None:
+        self._load_once("user_data", user_id, data)
+        self._stage("user_data", user_id, pickle.dumps(data))
+
+    async def update_chat_data(self, chat_id: int, data: dict) -> None:
+        self._load_once("chat_data", chat_id, data)
+        self._stage("chat_data", chat_id, pickle.dumps(data))
+
+    async def update_bot_data(self, data: dict) -> None:
+        pickled = pickle.dumps(data)
+        # bot_data is handed over on every run, so skip the write when nothing changed
+        if pickled != self._written_bot_data:
+            self._pending_bot_data = pickled
+            self._schedule_commit()
+
+    async def update_callback_data(self, data) -> None:
+        pass
+
+    async def update_conversation(self, name: str, key: tuple, new_state: Optional[object]) -> None:
+        self._stage("conversations", (name, json.dumps(key)), None if new_state is None else pickle.dumps(new_state))
+
+    async def drop_user_data(self, user_id: int) -> None:
+        self._stage("user_data", user_id, None)
+
+    async def drop_chat_data(self, chat_id: int) -> None:
+        self._stage("chat_data", chat_id, None)
+
+    def _has_pending(self) -> bool:
+        return any(self._pending.values()) or self._pending_bot_data is not None
+
+    async def _commit(self) -> None:
+        """
+        The only writer while the bot runs. Rows staged during a write are picked up by the next loop,
+        so commits never overlap and a newer snapshot is never overwritten by an older one.
+        """
+        try:
+            # Yield once so the other update_* calls of this persistence run are staged into the same commit
+            await asyncio.sleep(0)
+            while self._has_pending():
+                pending, bot_data = self._pending, self._pending_bot_data
+                self._pending = {"user_data": {}, "chat_data": {}, "conversations": {}}
+                self._pending_bot_data = None
+                try:
+                    await asyncio.to_thread(self._write, pending, bot_data)
+                except sqlite3.Error as e:
+                    logger.error(f"Failed to write persistence data: {e}")
+                    continue
+                if bot_data is not None:
+                    self._written_bot_data = bot_data
+        finally:
+            self._commit_task = None
+
+    def _write(self, pending: dict, bot_data: Optional[bytes]) -> None:
+        with self._write_lock, self._writer:
+            for table in ("user_data", "chat_data"):
+                rows = pending[table]
+                self._writer.executemany(
+                    f"INSERT INTO {table} (id, data) VALUES (?, ?) ON CONFLICT(id) DO UPDATE SET data = excluded.data",
+                    [(row_id, data) for row_id, data in rows.items() if data is not None],
+                )
+                self._writer.executemany(
+                    f"DELETE FROM {table} WHERE id = ?", [(row_id,) for row_id, data in rows.items() if data is None]
+                )
+            conversations = pending["conversations"]
+            self._writer.executemany(
+                "INSERT INTO conversations (name, key, state) VALUES (?, ?, ?) "
+                "ON CONFLICT(name, key) DO UPDATE SET state = excluded.state",
+                [(name, key, state) for (name, key), state in conversations.items() if state is not None],
+            )
+            self._writer.executemany(
+                "DELETE FROM conversations WHERE name = ? AND key = ?",
+                [(name, key) for (name, key), state in conversations.items() if state is None],
+            )
+            if bot_data is not None:
+                self._writer.execute(
+                    "INSERT INTO bot_data (id, data) VALUES (0, ?) ON CONFLICT(id) DO UPDATE SET data = excluded.data",
+                    (bot_data,),
+                )
+
+    async def flush(self) -> None:
+        """Writes whatever is still staged and closes the database. Called once on shutdown."""
+        if self._commit_task is not None:
+            await self._commit_task
+        if self._has_pending():
+            self._write(self._pending, self._pending_bot_data)
+        with self._write_lock:
+            self._reader.close()
+            self._writer.close()
+
+
+# --- Command Handlers ---
+@metrics.timed("start")
+async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Handles the /start command.
+    - If it has a payload (from a deep link), it sends videos.
+    - Otherwise, it shows the main menu.
+    """
+    # Check if the command includes a payload (from a deep link)
+    if context.args:
+        payload = context.args[0]
+        logger.debug(f"Deep link clicked with payload: {payload}")
+
+        episode_range = catalog.ranges_by_payload.get(payload)
+        if episode_range:
+            await request_video_series(update, context, episode_range)
+        else:
+            await update.message.reply_text("Sorry, I don't recognize this link.")
+
+    else:
+        # If there's no payload, show the main menu
+        await update.message.reply_text(WELCOME_MESSAGE, reply_markup=catalog.menu_markup)
+
+
+# --- Video Sending Logic ---
+def chunked(iterable, size: int) -> Iterator[list]:
+    """Yields lists of up to `size` items from `iterable`, consuming it lazily."""
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+def delivery_batches(series: str, episodes) -> Iterator[Tuple[str, list]]:
+    """
+    Splits (episode, file_id) pairs into the batches they are sent in, as (mode, batch) in episode order.
+    - "copy" mode groups consecutive episodes that have a storage channel post into batches of up to 100.
+      Episodes without one are sent as videos, one per batch.
+    - "album" mode makes media groups of up to 10. A media group needs at least two items,
+      so a one-episode batch (the tail of a range or page) is sent as a video instead.
+    - Otherwise each episode is its own batch.
+    """
+    if DELIVERY_MODE == "copy":
+        runs = itertools.groupby(episodes, key=lambda episode: catalog.storage_message(series, episode[0]) is not None)
+        for stored, run in runs:
+            if stored:
+                yield from (("copy", batch) for batch in chunked(run, BulkRequestLimit.MAX_LIMIT))
+            else:
+                yield from (("video", [episode]) for episode in run)
+    elif DELIVERY_MODE == "album":
+        for batch in chunked(episodes, MediaGroupLimit.MAX_MEDIA_LENGTH):
+            yield ("album" if len(batch) >= MediaGroupLimit.MIN_MEDIA_LENGTH else "video"), batch
+    else:
+        yield from (("video", [episode]) for episode in episodes)
+
+
+async def send_videos(context: ContextTypes.DEFAULT_TYPE, chat_id: int, batch: list) -> None:
+    """Sends each episode as its own video. An episode Telegram rejects is logged and skipped."""
+    for i, video_id in batch:
+        try:
+            sent_message = await context.bot.send_video(
+                chat_id=chat_id,
+                video=video_id,
+                caption=EPISODE_CAPTION.format(episode=i),
+            )
+        except BadRequest as e:
+            if len(batch) == 1:
+                raise
+            logger.error(f"Skipping episode {i} in chat {chat_id}: {e}")
+            continue
+        expiry.schedule(context.job_queue, chat_id, [sent_message.message_id])
+
+
+async def send_episode_batch(context: ContextTypes.DEFAULT_TYPE, chat_id: int, series: str, mode: str,
+                             batch: list) -> None:
+    """
+    Sends one batch from `delivery_batches` and schedules the sent messages for deletion.
+    - "copy" copies the episodes' storage channel posts with one copyMessages call.
+    - "album" sends the batch as a single media group.
+    - "video" sends each episode as its own video.
+    A rejected copy or media group is sent again as single videos, so one broken episode does not take the others down.
+    """
+    try:
+        if mode == "copy":
+            message_ids = [catalog.storage_message(series, i) for i, _ in batch]
+            copies = await context.bot.copy_messages(
+                chat_id=chat_id, from_chat_id=catalog.storage_chat(series), message_ids=sorted(filter(None, message_ids))
+            )
+            expiry.schedule(context.job_queue, chat_id, [m.message_id for m in copies])
+            return
+        if mode == "album":
+            media = [InputMediaVideo(media=video_id, caption=EPISODE_CAPTION.format(episode=i)) for i, video_id in batch]
+            sent_messages = await context.bot.send_media_group(chat_id=chat_id, media=media)
+            # Schedule the messages for deletion using the config variable
+            expiry.schedule(context.job_queue, chat_id, [m.message_id for m in sent_messages])
+            return
+    except BadRequest as e:
+        logger.warning(f"{mode} batch of episodes {batch[0][0]}-{batch[-1][0]} rejected in chat {chat_id} ({e}); "
+                       f"sending them one by one.")
+    await send_videos(context, chat_id, batch)
+
+
+# Sends running in the background, keyed by (chat_id, range payload)
+in_flight_sends = {}
+
+
+async def request_video_series(update: Update, context: ContextTypes.DEFAULT_TYPE, episode_range: EpisodeRange,
+                               first_episode: Optional[int] = None):
+    """
+    Starts sending `episode_range` in the background.
+    If the same range is already being sent to this chat, the request joins that send instead.
+    """
+    chat_id = update.effective_chat.id
+    key = (chat_id, episode_range.payload)
+    if key in in_flight_sends:
+        logger.info(f"Send of {episode_range.payload} already running for chat {chat_id}; not starting another.")
+        await context.bot.send_message(chat_id=chat_id, text=f"{episode_range.series_name} is already being sent.")
+        return
+
+    task = context.application.create_task(
+        send_video_series(update, context, episode_range, first_episode), update=update
+    )
+    in_flight_sends[key] = task
+    task.add_done_callback(lambda _: in_flight_sends.pop(key, None))
+
+
+@metrics.timed("send_video_series")
+async def send_video_series(update: Update, context: ContextTypes.DEFAULT_TYPE, episode_range: EpisodeRange,
+                            first_episode: Optional[int] = None):
+    """
+    Sends a series of videos and schedules them for deletion.
+    - With PAGE_SIZE set, only one page is sent, followed by a "Next" button for the rest.
+    - The last episode delivered is kept in chat_data["cursors"], so an interrupted send resumes after it.
+      A network error or a blocked bot ends the send before the failed batch, so a resume sends it again.
+      An episode Telegram rejects (a broken file ID, say) is logged and skipped.
+      The cursor is dropped once the episodes it follows have been deleted (DELETION_DELAY_SECONDS).
+    """
+    chat_id = update.effective_chat.id
+    series_name = episode_range.series_name
+    cursors = context.chat_data.setdefault("cursors", {})
+
+    # A cursor is (last episode delivered, time the first of those episodes was sent). Once that first
+    # episode has expired, resuming would skip deleted episodes, so the cursor is ignored.
+    cursor = cursors.get(episode_range.payload)
+    if not isinstance(cursor, tuple) or time.time() - cursor[1] >= DELETION_DELAY_SECONDS:
+        cursor = None
+    started_at = cursor[1] if cursor else time.time()
+
+    resuming = False
+    if first_episode is None:
+        resuming = cursor is not None
+        first_episode = cursor[0] + 1 if resuming else episode_range.start
+
+    remaining = catalog.episodes(episode_range.series, first_episode, episode_range.end)
+    first = next(remaining, None)
+    if first is None and resuming:
+        # Nothing left after the cursor: send the range from its start
+        resuming = False
+        started_at = time.time()
+        cursors.pop(episode_range.payload, None)
+        remaining = catalog.episodes(episode_range.series, episode_range.start, episode_range.end)
+        first = next(remaining, None)
+
+    if first is None:
+        logger.warning(f"No video IDs found for series: {series_name}")
+        await context.bot.send_message(chat_id=chat_id, text=f"Sorry, no videos are available for {series_name} yet.")
+        return
+
+    if resuming:
+        await context.bot.send_message(chat_id=chat_id, text=f"Resuming {series_name} from episode {first[0]}...")
+    elif first[0] <= episode_range.start:
+        await context.bot.send_message(chat_id=chat_id, text=f"Sending {series_name}...")
+    else:
+        await context.bot.send_message(chat_id=chat_id, text=f"Sending {series_name} from episode {first[0]}...")
+
+    remaining = itertools.chain([first], remaining)
+    page = itertools.islice(remaining, PAGE_SIZE) if PAGE_SIZE else remaining
+    for mode, batch in delivery_batches(episode_range.series, page):
+        try:
+            async with bulk_lane.slot(chat_id):
+                await send_episode_batch(context, chat_id, episode_range.series, mode, batch)
+        except BadRequest as e:
+            # Telegram rejected the batch itself and would reject it again, so skip it rather than block the range
+            logger.error(f"Skipping episodes {batch[0][0]}-{batch[-1][0]} of {series_name}: {e}")
+        except (NetworkError, Forbidden) as e:
+            # Transient, or the bot was blocked: stop at the gap, so a resume sends this batch again
+            logger.error(f"Stopped sending {series_name} before episode {batch[0][0]}: {e}")
+            if not isinstance(e, Forbidden):
+                await context.bot.send_message(
+                    chat_id=chat_id,
+                    text=f"Sending {series_name} stopped before episode {batch[0][0]}. Open the link again to continue.",
+                )
+            return
+        except Exception as e:
+            logger.error(f"Failed to send episodes {batch[0][0]}-{batch[-1][0]} of {series_name}: {e}")
+        cursors[episode_range.payload] = (batch[-1][0], started_at)
+        context.application.mark_data_for_update_persistence(chat_ids=chat_id)
+
+    next_episode = next(remaining, None)
+    if next_episode is None:
+        # The whole range went out, so the next request starts from the beginning again
+        cursors.pop(episode_range.payload, None)
+        context.application.mark_data_for_update_persistence(chat_ids=chat_id)
+        return
+
+    reply_markup = InlineKeyboardMarkup([[InlineKeyboardButton(
+        f"Next {PAGE_SIZE} ▶️", callback_data=f"next_{episode_range.payload}_{next_episode[0]}"
+    )]])
+    await context.bot.send_message(
+        chat_id=chat_id,
+        text=f"{series_name}: နောက်ထပ် {PAGE_SIZE} ပိုင်း ကြည့်ရန် အောက်က button ကိုနှိပ်ပါ။",
+        reply_markup=reply_markup,
+    )
+
+
+# --- Button Click Handler ---
+@metrics.timed("button_handler")
+async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Handles button clicks.
+    - Range buttons from the menu get a deep link message.
+    - "Next" buttons send the next page of a range.
+    """
+    query = update.callback_query
+    await query.answer() # Acknowledge the button press
+
+    if query.data.startswith("next_"):
+        payload, _, episode = query.data[len("next_"):].rpartition("_")
+        episode_range = catalog.ranges_by_payload.get(payload)
+        if episode_range and episode.isdigit():
+            await request_video_series(update, context, episode_range, first_episode=int(episode))
+        return
+
+    # Filled in from get_me() once when the bot is initialized, so no API call per click
+    bot_username = context.bot.username
+
+    episode_range = catalog.ranges_by_callback.get(query.data)
+    if episode_range:
+        deep_link = f"https://t.me/{bot_username}?start={episode_range.payload}"
+        message_text = (
+            f"{episode_range.series_name} ကို ကြည့်ရန် အောက်က link ကိုနှိပ်ပါ။\n\n"
+            f"{deep_link}"
+        )
+        await context.bot.send_message(chat_id=query.message.chat_id, text=message_text)
+
+
+# --- Inline Search ---
+@metrics.timed("inline_query")
+async def inline_query_handler(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Answers inline queries (`@bot 1045`, `@bot onepiece 10`) from the catalog's prebuilt search index."""
+    query = update.inline_query
+    await query.answer(catalog.search(query.query), cache_time=INLINE_CACHE_SECONDS)
+
+
+# --- Application Setup ---
+def build_application(token: str, base_url: Optional[str] = None, worker: int = 0, workers: int = 1) -> Application:
+    """
+    Builds the Application with persistence, rate limiting, handlers and jobs.
+    - `base_url` points the bot at a different Bot API server (the benchmark's fake one, for example).
+    - `worker` and `workers` give a sharded webhook worker its share of the send budget and its own ledger file.
+    """
+    # NEW: Use an environment variable for the persistence file path
+    # This allows us to place it on a persistent disk on Render
+    persistence_path = os.environ.get("PERSISTENCE_PATH", "bot_persistence")
+    persistence = SQLitePersistence(f"{persistence_path}.sqlite3")
+
+    expiry.ledger = DeletionLedger(LEDGER_PATH if workers == 1 else f"{LEDGER_PATH}.{worker}")
+
+    scheduler = SendScheduler(global_rate=GLOBAL_SEND_RATE / workers)
+    metrics.gauge("telebot_send_queue_depth", "Send requests waiting for a rate-limit token.", lambda: scheduler.waiting)
+    metrics.gauge("telebot_pending_deletions", "Sent messages waiting for their expiry sweep.", lambda: expiry.pending)
+    metrics.gauge("telebot_sends_in_flight", "Range sends currently running.", lambda: len(in_flight_sends))
+    metrics.gauge("telebot_bulk_lane_waiting_chats", "Chats waiting for a bulk send slot.", lambda: len(bulk_lane.order))
+
+    builder = (
+        Application.builder()
+        .token(token)
+        .persistence(persistence)
+        .rate_limiter(scheduler)
+        .concurrent_updates(PriorityUpdateProcessor())
+        .post_init(functools.partial(post_init, worker=worker, workers=workers))
+        .post_shutdown(post_shutdown)
+    )
+    if base_url:
+        builder = builder.base_url(base_url)
+    application = builder.build()
+
+    application.add_handler(CommandHandler("start", start))
+    application.add_handler(CallbackQueryHandler(button_handler))
+    application.add_handler(InlineQueryHandler(inline_query_handler))
+
+    application.job_queue.run_repeating(
+        reload_catalog_callback, interval=CATALOG_RELOAD_SECONDS, first=CATALOG_RELOAD_SECONDS, name="reload_catalog"
+    )
+    application.job_queue.run_repeating(flush_ledger_callback, interval=LEDGER_FLUSH_SECONDS, name="flush_ledger")
+    application.job_queue.run_repeating(
+        compact_ledger_callback, interval=LEDGER_COMPACT_SECONDS, first=LEDGER_COMPACT_SECONDS, name="compact_ledger"
+    )
+    return application
+
+
+# --- Sharded Webhook Serving ---
+def update_chat_id(data: dict) -> Optional[int]:
+    """Finds the chat (or, failing that, the user) a raw webhook update belongs to."""
+    for value in data.values():
+        if not isinstance(value, dict):
+            continue
+        # Callback queries carry the chat on the message they were attached to
+        message = value.get("message") if isinstance(value.get("message"), dict) else value
+        chat = message.get("chat") or value.get("chat")
+        if isinstance(chat, dict):
+            return chat.get("id")
+        user = value.get("from") or value.get("user")
+        if isinstance(user, dict):
+            return user.get("id")
+    return None
+
+
+def adopt_orphaned_ledgers(job_queue, worker: int, workers: int) -> list:
+    """
+    Restores ledgers no running process writes to any more, so their deletions are not lost when
+    WEBHOOK_WORKERS changes. Returns the adopted file paths.
+    - A single process uses LEDGER_PATH and adopts every LEDGER_PATH.<n> left by sharded workers.
+    - Sharded worker 0 adopts LEDGER_PATH, and worker i adopts LEDGER_PATH.<n> for n >= workers with n % workers == i.
+    """
+    adopted = []
+    for path in [LEDGER_PATH] + glob.glob(f"{glob.escape(LEDGER_PATH)}.*"):
+        if path == expiry.ledger.path or not os.path.exists(path):
+            continue
+        suffix = path[len(LEDGER_PATH) + 1:]
+        if path == LEDGER_PATH:
+            owner = 0
+        elif suffix.isdigit():
+            owner = int(suffix) % workers
+        else:
+            continue
+        if owner == worker:
+            expiry.restore(job_queue, DeletionLedger(path))
+            adopted.append(path)
+    return adopted
+
+
+async def serve_shard(token: str, index: int, workers: int, updates) -> None:
+    """Runs the bot for one shard of chats, processing the raw updates the front process forwards."""
+    application = build_application(token, worker=index, workers=workers)
+    await application.initialize()
+    await application.post_init(application)
+    await application.start()
+    if METRICS_PORT:
+        start_metrics_server(int(METRICS_PORT) + index)
+    logger.info(f"Webhook worker {index + 1}/{workers} started.")
+
+    loop = asyncio.get_running_loop()
+    try:
+        while (raw := await loop.run_in_executor(None, updates.get)) is not None:
+            await application.update_queue.put(Update.de_json(json.loads(raw), application.bot))
+    finally:
+        await application.stop()
+        await application.shutdown()
+        await post_shutdown(application)
+
+
+def run_worker(token: str, index: int, workers: int, updates) -> None:
+    """Worker process entry point. Shutdown is driven by the front process, not by signals."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    asyncio.run(serve_shard(token, index, workers, updates))
+
+
+def run_sharded_webhook(token: str, webhook_url: str, port: int, workers: int) -> None:
+    """
+    Serves the webhook from a small front process that forwards each update to one of `workers`
+    bot processes, chosen by chat_id, so a chat's updates are always handled in order by the same worker.
+    - The catalog is loaded before forking, so workers share it read-only.
+    - Each worker gets 1/workers of the global send budget. Per-chat budgets, cursors and in-flight
+      sends stay local, because a chat never changes worker.
+    - Deletions go to a per-worker ledger file, and chat/user data to the shared SQLite database.
+    - A worker that dies is restarted on a fresh queue. The updates it had taken or that were queued for it
+      are lost, but its chats are answered again from then on. If an update cannot be queued, Telegram
+      gets a 503 and delivers it again.
+    """
+    mp = multiprocessing.get_context("fork")
+    queues = [mp.Queue() for _ in range(workers)]
+    processes = [None] * workers
+    workers_lock = threading.Lock()
+
+    def start_worker(i: int) -> None:
+        processes[i] = mp.Process(target=run_worker, args=(token, i, workers, queues[i]), name=f"webhook-worker-{i}")
+        processes[i].start()
+
+    def revive(i: int) -> None:
+        """Restarts worker `i` if it died. Updates it had already taken, or that were still queued for it, are lost."""
+        if processes[i].is_alive():
+            return
+        logger.error(f"Webhook worker {i} exited with code {processes[i].exitcode}; restarting it.")
+        # The dead worker sat in updates.get() holding the queue's read lock, so the old queue is unusable
+        queues[i] = mp.Queue()
+        start_worker(i)
+
+    def forward(i: int, body: bytes) -> None:
+        """Queues an update for worker `i`, restarting the worker first if it died."""
+        with workers_lock:
+            revive(i)
+            queues[i].put(body)
+
+    for i in range(workers):
+        start_worker(i)
+
+    async def set_webhook() -> None:
+        async with Bot(token) as bot:
+            await bot.set_webhook(url=f"{webhook_url}/{token}")
+
+    asyncio.run(set_webhook())
+
+    class WebhookHandler(BaseHTTPRequestHandler):
+        def do_POST(self) -> None:
+            if self.path != f"/{token}": # Use token as a secret path
+                self.send_error(404)
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                chat_id = update_chat_id(json.loads(body)) or 0
+            except (ValueError, AttributeError):
+                self.send_error(400)
+                return
+            try:
+                forward(chat_id % workers, body)
+            except Exception as e:
+                # Telegram retries a failed delivery, so the update is not lost
+                logger.error(f"Failed to hand an update to a webhook worker: {e}")
+                self.send_error(503)
+                return
+            self.send_response(200)
+            self.end_headers()
+
+        def log_message(self, format: str, *args) -> None:
+            pass
+
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    class WebhookServer(ThreadingHTTPServer):
+        def service_actions(self) -> None:
+            # Runs between requests too, so a dead worker's expiry jobs do not wait for its next update
+            with workers_lock:
+                for i in range(workers):
+                    try:
+                        revive(i)
+                    except Exception as e:
+                        logger.error(f"Failed to restart webhook worker {i}: {e}")
+
+    signal.signal(signal.SIGTERM, stop)
+    server = WebhookServer(("0.0.0.0", port), WebhookHandler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Stopping webhook workers...")
+    finally:
+        server.server_close()
+        for updates in queues:
+            updates.put(None)
+        for process in processes:
+            process.join(timeout=60)
+
+
+# --- Main Bot Function (UPDATED FOR RENDER) ---
+def main() -> None:
+    """Starts the bot in webhook mode for server or polling mode for local."""
+    token =("7893558945:AAG-DGexBsIh6cAGWaWI92rxzTW1O8CWhSs")
+    if not token:
+        logger.critical("FATAL: TELEGRAM_TOKEN environment variable not set!")
+        return
+
+    # Load the episode catalog once; the reload_catalog job picks up later edits
+    catalog.load()
+
+    # --- NEW: Webhook vs. Polling Logic ---
+    webhook_url = os.environ.get("RENDER_EXTERNAL_URL")
+    if webhook_url and WEBHOOK_WORKERS > 1:
+        port = int(os.environ.get("PORT", 8443))
+        logger.info(f"Starting bot in sharded webhook mode on port {port} with {WEBHOOK_WORKERS} workers")
+        run_sharded_webhook(token, webhook_url, port, WEBHOOK_WORKERS)
+        return
+
+    application = build_application(token)
+    if METRICS_PORT:
+        start_metrics_server(int(METRICS_PORT))
+    if webhook_url:
+        # Running on Render (or any server with this env var)
+        port = int(os.environ.get("PORT", 8443))
+        logger.info(f"Starting bot in webhook mode on port {port}")
+        application.run_webhook(
+            listen="0.0.0.0",
+            port=port,
+            url_path=token, # Use token as a secret path
+            webhook_url=f"{webhook_url}/{token}"
+        )
+    else:
+        # Running locally
+        logger.info("Starting bot in polling mode for local development")
+        application.run_polling()
+
+
+if __name__ == "__main__":
+    main()